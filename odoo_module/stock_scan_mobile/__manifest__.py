@@ -27,8 +27,15 @@ API Endpoints:
 * /api/health - Health check
 * /api/databases - Database listing
 * /api/pickings - Stock picking operations
+* /api/pickings/changes - Delta synchronization of pickings
 * /api/pickings/{id}/update_sn - Serial number updates
+* /api/pickings/{id}/validation_status - Background validation status
 * /api/serial/check - Serial number validation
+* /api/products/resolve - Batch barcode resolution
+* /api/products/{id}/thumbnail - Cached product thumbnail
+* /api/metrics - Prometheus metrics of the API
+* /api/admin/slow_requests - Slow request capture
+* /api/export/provisioning - Streaming export for device provisioning
 
 Compatible with StockScan Pro mobile application.
     ''',
@@ -41,7 +48,10 @@ Compatible with StockScan Pro mobile application.
         'product',
         'web',
     ],
-    'data': [],
+    'data': [
+        'data/ir_cron_data.xml',
+    ],
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'auto_install': False,
     'application': False,
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the mobile API against a synthetic warehouse
+
+Run it with Odoo's test runner on a scratch database:
+
+    odoo-bin -d stock_scan_bench -i stock_scan_mobile --stop-after-init \
+        --test-tags stock_scan_mobile_benchmark
+
+Environment variables:
+- STOCK_SCAN_MOBILE_BENCHMARK_PRESET: small (default), medium or large
+- STOCK_SCAN_MOBILE_BENCHMARK_ITERATIONS: timed iterations per scenario (default: 30)
+- STOCK_SCAN_MOBILE_BENCHMARK_REPORT: path of the JSON report
+"""
+
+from .generator import WarehouseGenerator, PRESETS
+from .scenarios import BenchmarkClient, SCENARIOS, P95_TARGETS_MS, run_scenarios, write_report
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+from datetime import timedelta
+
+from odoo import fields
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_LOGIN = 'stock_scan_mobile_benchmark'
+
+# Catalog products are created by batches of this size
+CATALOG_BATCH_SIZE = 5000
+# Search terms of each kind used by the product search scenarios
+SEARCH_TERMS = 50
+
+# Warehouse sizes, selected with STOCK_SCAN_MOBILE_BENCHMARK_PRESET
+PRESETS = {
+    'small': {
+        'products': 20, 'lots_per_product': 50, 'quants_per_product': 40, 'locations': 10,
+        'history_per_lot': 2, 'pickings': 20, 'moves_per_picking': 3, 'receipts': 40, 'serials_per_receipt': 10,
+        'catalog_products': 1000,
+    },
+    'medium': {
+        'products': 200, 'lots_per_product': 200, 'quants_per_product': 150, 'locations': 50,
+        'history_per_lot': 5, 'pickings': 200, 'moves_per_picking': 5, 'receipts': 100, 'serials_per_receipt': 50,
+        'catalog_products': 20000,
+    },
+    'large': {
+        'products': 1000, 'lots_per_product': 500, 'quants_per_product': 400, 'locations': 200,
+        'history_per_lot': 10, 'pickings': 1000, 'moves_per_picking': 10, 'receipts': 200, 'serials_per_receipt': 100,
+        'catalog_products': 200000,
+    },
+}
+
+
+class WarehouseGenerator(object):
+    """
+    Fill a database with a synthetic, reproducible serial-tracked warehouse
+
+    Args:
+        env: Odoo environment (superuser)
+        seed (int): seed of the random choices, so that two runs build the same data
+        **sizes: counts overriding the 'small' preset, see PRESETS
+            products: serial-tracked products
+            lots_per_product: serial numbers per product
+            quants_per_product: serial numbers in stock per product
+            locations: internal shelves under the warehouse stock location
+            history_per_lot: past move lines per serial number
+            pickings: outgoing pickings, confirmed and reserved
+            moves_per_picking: moves per outgoing picking
+            receipts: incoming pickings, ready for update_sn uploads
+            serials_per_receipt: units expected by each receipt
+            catalog_products: untracked products searched by the product
+                search scenarios (the large preset is the 200,000 variant
+                catalog of the type-ahead target)
+    """
+
+    def __init__(self, env, seed=42, **sizes):
+        self.env = env
+        self.rng = random.Random(seed)
+        self.sizes = dict(PRESETS['small'], **sizes)
+
+    def generate(self):
+        """
+        Create the warehouse
+
+        Returns:
+            dict: IDs and names used by the benchmark scenarios
+        """
+        sizes = self.sizes
+        env = self.env
+        warehouse = env['stock.warehouse'].search([('company_id', '=', env.company.id)], limit=1)
+        stock_location = warehouse.lot_stock_id
+        supplier_location = env.ref('stock.stock_location_suppliers')
+        customer_location = env.ref('stock.stock_location_customers')
+
+        user = env['res.users'].create({
+            'name': 'Mobile Benchmark Scanner',
+            'login': BENCHMARK_LOGIN,
+            'password': BENCHMARK_LOGIN,
+            'groups_id': [(6, 0, [env.ref('stock.group_stock_user').id])],
+        })
+
+        shelves = env['stock.location'].create([{
+            'name': f'BENCH-{index:04d}',
+            'location_id': stock_location.id,
+            'usage': 'internal',
+        } for index in range(sizes['locations'])])
+
+        products = env['product.product'].create([{
+            'name': f'Benchmark Product {index:05d}',
+            'default_code': f'BENCH-{index:05d}',
+            'barcode': f'9{index:012d}',
+            'type': 'product',
+            'tracking': 'serial',
+        } for index in range(sizes['products'])])
+        _logger.info(f"Benchmark: created {len(products)} products")
+
+        lots = env['stock.production.lot'].create([{
+            'name': f'BSN-{product.id}-{index:06d}',
+            'product_id': product.id,
+            'company_id': env.company.id,
+        } for product in products for index in range(sizes['lots_per_product'])])
+        _logger.info(f"Benchmark: created {len(lots)} serial numbers")
+
+        lots_by_product = {}
+        for lot in lots:
+            lots_by_product.setdefault(lot.product_id.id, []).append(lot)
+
+        in_stock = [lot for product_lots in lots_by_product.values() for lot in product_lots[:sizes['quants_per_product']]]
+        env['stock.quant'].create([{
+            'product_id': lot.product_id.id,
+            'lot_id': lot.id,
+            'location_id': self.rng.choice(shelves).id,
+            'quantity': 1.0,
+        } for lot in in_stock])
+        _logger.info(f"Benchmark: created {len(in_stock)} quants")
+
+        now = fields.Datetime.now()
+        env['stock.move.line'].create([{
+            'product_id': lot.product_id.id,
+            'product_uom_id': lot.product_id.uom_id.id,
+            'lot_id': lot.id,
+            'location_id': supplier_location.id,
+            'location_dest_id': self.rng.choice(shelves).id,
+            'qty_done': 1.0,
+            'company_id': env.company.id,
+            'date': now - timedelta(days=self.rng.randint(1, 720), seconds=self.rng.randint(0, 86400)),
+        } for lot in lots for _index in range(sizes['history_per_lot'])])
+        _logger.info(f"Benchmark: created {len(lots) * sizes['history_per_lot']} history move lines")
+
+        def picking_vals(picking_type, location, location_dest, product_quantities):
+            return {
+                'picking_type_id': picking_type.id,
+                'location_id': location.id,
+                'location_dest_id': location_dest.id,
+                'move_lines': [(0, 0, {
+                    'name': product.display_name,
+                    'product_id': product.id,
+                    'product_uom': product.uom_id.id,
+                    'product_uom_qty': quantity,
+                    'location_id': location.id,
+                    'location_dest_id': location_dest.id,
+                }) for product, quantity in product_quantities],
+            }
+
+        outgoing = env['stock.picking'].create([
+            picking_vals(warehouse.out_type_id, stock_location, customer_location, [
+                (product, self.rng.randint(1, 3))
+                for product in self.rng.sample(list(products), min(sizes['moves_per_picking'], len(products)))
+            ])
+            for _index in range(sizes['pickings'])
+        ])
+        outgoing.action_confirm()
+        outgoing.action_assign()
+        _logger.info(f"Benchmark: created {len(outgoing)} outgoing pickings")
+
+        receipts = env['stock.picking'].create([
+            picking_vals(warehouse.in_type_id, supplier_location, stock_location, [
+                (self.rng.choice(products), sizes['serials_per_receipt'])
+            ])
+            for _index in range(sizes['receipts'])
+        ])
+        receipts.action_confirm()
+        _logger.info(f"Benchmark: created {len(receipts)} receipts")
+
+        catalog_size = sizes['catalog_products']
+        for start in range(0, catalog_size, CATALOG_BATCH_SIZE):
+            env['product.product'].create([{
+                'name': f'Catalog Item {index:06d}',
+                'default_code': f'CAT-{index:06d}',
+                'barcode': f'8{index:012d}',
+                'type': 'consu',
+            } for index in range(start, min(start + CATALOG_BATCH_SIZE, catalog_size))])
+            env['product.product'].invalidate_cache()
+        _logger.info(f"Benchmark: created {catalog_size} catalog products")
+
+        # Exact codes, prefixes of references, and name fragments that only
+        # the substring tier of search_for_mobile finds
+        catalog_indexes = self.rng.sample(range(catalog_size), min(SEARCH_TERMS, catalog_size))
+        search_terms = {
+            'exact': [f'8{index:012d}' if index % 2 else f'CAT-{index:06d}' for index in catalog_indexes],
+            'prefix': [f'CAT-{index:06d}'[:8] for index in catalog_indexes],
+            'fuzzy': [f'tem {index:06d}'[:8] for index in catalog_indexes],
+        }
+
+        return {
+            'login': BENCHMARK_LOGIN,
+            'password': BENCHMARK_LOGIN,
+            'user_id': user.id,
+            'product_ids': products.ids,
+            'lot_names': lots.mapped('name'),
+            'search_terms': search_terms,
+            'picking_ids': outgoing.ids,
+            'receipts': [{
+                'picking_id': receipt.id,
+                'moves': [{
+                    'move_id': move.id,
+                    'product_id': move.product_id.id,
+                    'quantity': int(move.product_uom_qty),
+                } for move in receipt.move_lines],
+            } for receipt in receipts],
+        }
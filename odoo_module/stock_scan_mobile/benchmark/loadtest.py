@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test of the mobile API with many concurrent simulated handhelds
+
+Every device runs scan sessions in a loop until the test ends:
+login, list the ready receipts, check a few serial numbers one by one,
+check a batch, upload serial numbers to one of the listed receipts (retrying
+uploads rejected for a concurrent update, as the app does) and logout.
+Devices pick their receipts among the same small set, like operators
+sharing a dock, so that uploads contend for the same rows.
+
+The script only needs ``requests`` (psycopg2 for --pg-dsn) and runs
+against a local Odoo server, e.g. on a database filled by the benchmark
+generator (see README, Benchmarks):
+
+    python3 loadtest.py --url http://localhost:8069 --db stock_scan_bench \\
+        --devices 60 --duration 120 --pg-dsn "dbname=stock_scan_bench"
+
+The JSON report holds the throughput, latency percentiles per step, the
+error codes returned by the API, the serialization failure and deadlock
+counts, and with --pg-dsn the deadlocks and rollbacks seen by PostgreSQL.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile of a list of numbers (rank between 0 and 100)"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(rank / 100.0 * len(values)) - 1)]
+
+
+class LoadStats(object):
+    """Latencies and errors of all devices"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.step_errors = Counter()
+        self.sessions = 0
+        self.retries = 0
+
+    def record(self, step, duration_ms, error_code=None):
+        with self._lock:
+            self.latencies[step].append(duration_ms)
+            if error_code:
+                self.errors[error_code] += 1
+                self.step_errors[step] += 1
+
+    def count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            'duration_s': round(elapsed, 1),
+            'sessions': self.sessions,
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+            'upload_retries': self.retries,
+            'serialization_failures': self.errors['SERIALIZATION_FAILURE'],
+            'deadlocks': self.errors['DEADLOCK_DETECTED'],
+            'errors': dict(self.errors),
+            'steps': {
+                step: {
+                    'count': len(values),
+                    'errors': self.step_errors[step],
+                    'p50_ms': round(percentile(values, 50), 1),
+                    'p95_ms': round(percentile(values, 95), 1),
+                    'p99_ms': round(percentile(values, 99), 1),
+                    'max_ms': round(max(values), 1),
+                }
+                for step, values in sorted(self.latencies.items())
+            },
+        }
+
+
+class Device(threading.Thread):
+    """One simulated handheld, running scan sessions until stop is set"""
+
+    def __init__(self, index, options, stats, stop):
+        super().__init__(name=f'device-{index}', daemon=True)
+        self.index = index
+        self.options = options
+        self.stats = stats
+        self.stop = stop
+        self.rng = random.Random(options.seed + index)
+        self.http = requests.Session()
+        self.token = None
+        self.sequence = 0
+        self.known_serials = []
+
+    def call(self, step, path, params):
+        """Send a JSON-RPC request and record it; return its result, or None on transport errors"""
+        url = self.options.url.rstrip('/') + path
+        if self.options.db:
+            url += f'?db={self.options.db}'
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}, separators=(',', ':')).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.options.gzip:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        start = time.perf_counter()
+        error_code = None
+        result = None
+        try:
+            response = self.http.post(url, data=body, headers=headers, timeout=self.options.timeout)
+            if response.status_code != 200:
+                error_code = f'HTTP_{response.status_code}'
+            else:
+                body = response.json()
+                if 'error' in body:
+                    error_code = 'RPC_ERROR'
+                else:
+                    result = body['result']
+                    if not result.get('success'):
+                        error_code = result.get('error_code') or 'UNKNOWN'
+        except requests.RequestException as e:
+            error_code = f'TRANSPORT_{type(e).__name__}'
+        self.stats.record(step, (time.perf_counter() - start) * 1000, error_code)
+        return result
+
+    def think(self):
+        if self.options.think_time:
+            time.sleep(self.rng.uniform(0, self.options.think_time))
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                self.session()
+            except Exception as e:
+                # Keep the device running whatever the server answers
+                self.stats.record('session', 0, f'CLIENT_{type(e).__name__}')
+            self.stats.count('sessions')
+
+    def session(self):
+        result = self.call('login', '/api/auth/login', {
+            'username': self.options.login,
+            'password': self.options.password,
+            'device_id': f'LOADTEST-{self.index:03d}',
+        })
+        if not result or not result.get('success'):
+            time.sleep(1)
+            return
+        self.token = result['token']
+
+        result = self.call('list', '/api/pickings', {'token': self.token, 'type': 'in', 'limit': 50})
+        pickings = [
+            picking for picking in (result or {}).get('pickings', [])
+            if any(product['tracking'] == 'serial' for product in picking['products'])
+        ][:self.options.shared_pickings]
+        self.think()
+
+        for _index in range(self.options.checks):
+            if self.stop.is_set():
+                break
+            self.call('check', '/api/serial/check', {'token': self.token, 'serial_number': self.pick_serial()})
+            self.think()
+
+        self.call('batch_check', '/api/serial/batch_check', {
+            'token': self.token,
+            'serial_numbers': [self.pick_serial() for _index in range(self.options.batch_size)],
+        })
+        self.think()
+
+        if pickings:
+            self.upload(self.rng.choice(pickings))
+            self.think()
+
+        self.call('logout', '/api/auth/logout', {'token': self.token})
+
+    def pick_serial(self):
+        if self.known_serials and self.rng.random() < 0.8:
+            return self.rng.choice(self.known_serials)
+        return f'LOADTEST-UNKNOWN-{self.rng.randint(0, 10 ** 6)}'
+
+    def upload(self, picking):
+        moves = [product for product in picking['products'] if product['tracking'] == 'serial']
+        serial_numbers = []
+        for _index in range(self.options.upload_size):
+            move = self.rng.choice(moves)
+            self.sequence += 1
+            serial_numbers.append({
+                'product_id': move['id'],
+                'move_id': move['move_id'],
+                'serial_number': f'LT-{self.options.seed}-{self.index:03d}-{self.sequence:07d}',
+                'location': 'LOADTEST',
+            })
+
+        payload = {
+            'token': self.token,
+            'serial_numbers': serial_numbers,
+            'idempotency_key': f'loadtest-{self.options.seed}-{self.index}-{self.sequence}',
+        }
+        for attempt in range(self.options.retries + 1):
+            result = self.call('upload', f"/api/pickings/{picking['id']}/update_sn", payload)
+            if not result or result.get('success') or not result.get('retryable'):
+                break
+            self.stats.count('retries')
+            time.sleep(self.rng.uniform(0, 0.2 * 2 ** attempt))
+
+        if result and result.get('success'):
+            self.known_serials.extend(serial['serial_number'] for serial in serial_numbers)
+            del self.known_serials[:-500]
+
+
+def read_pg_stats(dsn, dbname):
+    """Return the deadlock and rollback counters of PostgreSQL for a database"""
+    import psycopg2
+    with psycopg2.connect(dsn) as connection, connection.cursor() as cr:
+        cr.execute("""
+            SELECT deadlocks, xact_rollback, conflicts
+              FROM pg_stat_database
+             WHERE datname = %s
+        """, [dbname])
+        row = cr.fetchone()
+    connection.close()
+    return dict(zip(('deadlocks', 'xact_rollback', 'conflicts'), row or (0, 0, 0)))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8069', help='Odoo server URL')
+    parser.add_argument('--db', help='database name (needed when the server hosts several)')
+    parser.add_argument('--login', default='stock_scan_mobile_benchmark', help='login of the scanner user')
+    parser.add_argument('--password', default='stock_scan_mobile_benchmark', help='password of the scanner user')
+    parser.add_argument('--devices', type=int, default=60, help='concurrent simulated devices')
+    parser.add_argument('--duration', type=float, default=60, help='test duration in seconds')
+    parser.add_argument('--ramp-up', type=float, default=10, help='seconds over which devices start')
+    parser.add_argument('--think-time', type=float, default=0.5, help='maximum pause between scans (seconds)')
+    parser.add_argument('--checks', type=int, default=5, help='single serial checks per session')
+    parser.add_argument('--batch-size', type=int, default=20, help='serial numbers per batch check')
+    parser.add_argument('--upload-size', type=int, default=5, help='serial numbers per upload')
+    parser.add_argument('--shared-pickings', type=int, default=5,
+                        help='devices upload to the first N ready receipts (lower means more contention)')
+    parser.add_argument('--retries', type=int, default=3, help='retries of uploads rejected as concurrent')
+    parser.add_argument('--gzip', action='store_true', help='send gzip-compressed request bodies')
+    parser.add_argument('--timeout', type=float, default=60, help='request timeout (seconds)')
+    parser.add_argument('--seed', type=int, default=int(time.time()), help='random seed, also used in serial numbers')
+    parser.add_argument('--pg-dsn', help='libpq DSN to read PostgreSQL deadlock and rollback counters')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    stats = LoadStats()
+    stop = threading.Event()
+
+    pg_before = read_pg_stats(options.pg_dsn, options.db) if options.pg_dsn else None
+
+    devices = [Device(index, options, stats, stop) for index in range(options.devices)]
+    start = time.perf_counter()
+    for device in devices:
+        device.start()
+        time.sleep(options.ramp_up / max(len(devices), 1))
+
+    time.sleep(max(0, options.duration - (time.perf_counter() - start)))
+    stop.set()
+    for device in devices:
+        device.join(options.timeout)
+    elapsed = time.perf_counter() - start
+
+    report = stats.report(elapsed)
+    report['devices'] = options.devices
+    report['seed'] = options.seed
+    if pg_before is not None:
+        pg_after = read_pg_stats(options.pg_dsn, options.db)
+        report['postgres'] = {key: pg_after[key] - pg_before[key] for key in pg_after}
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    print(
+        f"{report['requests']} requests in {report['duration_s']} s ({report['throughput_rps']} req/s), "
+        f"{report['serialization_failures']} serialization failures, {report['deadlocks']} deadlocks",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
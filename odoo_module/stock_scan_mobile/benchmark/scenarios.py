@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime
+
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+BATCH_CHECK_SIZE = 100
+# Results per type-ahead search, as shown by the app
+SEARCH_LIMIT = 20
+
+# Latency targets, checked against the p95 of the scenarios (milliseconds):
+# type-ahead product search must stay under 50 ms on a 200,000 variant catalog
+P95_TARGETS_MS = {
+    'product_search_exact': 50,
+    'product_search_prefix': 50,
+    'product_search_fuzzy': 50,
+}
+
+
+class BenchmarkClient(object):
+    """
+    Call the mobile API over HTTP like a handheld does
+
+    Args:
+        url_open: HttpCase.url_open, or any callable with the same signature
+        env: Odoo environment, for the scenarios of model methods without a route
+    """
+
+    def __init__(self, url_open, env=None):
+        self.url_open = url_open
+        self.env = env
+        self.token = None
+
+    def call(self, path, params):
+        """
+        Send a JSON-RPC request
+
+        Returns:
+            tuple: (result dict, SQL query count reported by the server or None)
+        """
+        response = self.url_open(
+            path,
+            data=json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}),
+            headers={'Content-Type': 'application/json'},
+            timeout=120,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if 'error' in body:
+            raise AssertionError(f"{path} failed: {body['error']}")
+        sql_count = response.headers.get('X-Request-SQL-Count')
+        return body['result'], int(sql_count) if sql_count is not None else None
+
+    def call_method(self, func):
+        """
+        Call a model method on a cold ORM cache, as a request would
+
+        Returns:
+            tuple: ({'success': True, 'result': return value}, SQL query count)
+        """
+        self.env['base'].flush()
+        self.env['base'].invalidate_cache()
+        count = self.env.cr.sql_log_count
+        result = func(self.env)
+        return {'success': True, 'result': result}, self.env.cr.sql_log_count - count
+
+
+def scenario_login(client, dataset, rng, iteration):
+    return client.call('/api/auth/login', {
+        'username': dataset['login'],
+        'password': dataset['password'],
+        'device_id': f'BENCH-{iteration}',
+    })
+
+
+def scenario_picking_list(client, dataset, rng, iteration):
+    return client.call('/api/pickings', {'token': client.token, 'limit': 50})
+
+
+def scenario_serial_check(client, dataset, rng, iteration):
+    return client.call('/api/serial/check', {
+        'token': client.token,
+        'serial_number': rng.choice(dataset['lot_names']),
+    })
+
+
+def scenario_serial_batch_check(client, dataset, rng, iteration):
+    return client.call('/api/serial/batch_check', {
+        'token': client.token,
+        'serial_numbers': rng.sample(dataset['lot_names'], min(BATCH_CHECK_SIZE, len(dataset['lot_names']))),
+    })
+
+
+def scenario_serial_history(client, dataset, rng, iteration):
+    return client.call('/api/serial/history', {
+        'token': client.token,
+        'serial_number': rng.choice(dataset['lot_names']),
+        'limit': 20,
+    })
+
+
+def scenario_update_sn(client, dataset, rng, iteration):
+    # Every iteration fills another receipt with new serial numbers
+    receipt = dataset['receipts'][iteration % len(dataset['receipts'])]
+    return client.call(f"/api/pickings/{receipt['picking_id']}/update_sn", {
+        'token': client.token,
+        'serial_numbers': [{
+            'product_id': move['product_id'],
+            'move_id': move['move_id'],
+            'serial_number': f"BNEW-{receipt['picking_id']}-{move['move_id']}-{iteration}-{index}",
+            'location': 'BENCH',
+        } for move in receipt['moves'] for index in range(move['quantity'])],
+    })
+
+
+def _product_search_scenario(kind):
+    def scenario(client, dataset, rng, iteration):
+        term = rng.choice(dataset['search_terms'][kind])
+        return client.call_method(lambda env: env['product.product'].search_for_mobile(term, limit=SEARCH_LIMIT))
+    scenario.__name__ = f'scenario_product_search_{kind}'
+    return scenario
+
+
+# search_for_mobile has no route of its own: it is timed in process
+scenario_product_search_exact = _product_search_scenario('exact')
+scenario_product_search_prefix = _product_search_scenario('prefix')
+scenario_product_search_fuzzy = _product_search_scenario('fuzzy')
+
+
+SCENARIOS = [
+    ('login', scenario_login),
+    ('picking_list', scenario_picking_list),
+    ('serial_check', scenario_serial_check),
+    ('serial_batch_check', scenario_serial_batch_check),
+    ('serial_history', scenario_serial_history),
+    ('update_sn', scenario_update_sn),
+    ('product_search_exact', scenario_product_search_exact),
+    ('product_search_prefix', scenario_product_search_prefix),
+    ('product_search_fuzzy', scenario_product_search_fuzzy),
+]
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile of a list of numbers (rank between 0 and 100)"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(rank / 100.0 * len(values)) - 1)]
+
+
+def run_scenarios(client, dataset, iterations=30, warmup=3, seed=42, scenarios=SCENARIOS):
+    """
+    Time every scenario
+
+    Each scenario first runs ``warmup`` untimed iterations to fill the
+    caches of the server, then ``iterations`` timed ones.
+
+    Scenarios with a latency target (P95_TARGETS_MS) also report it, and
+    whether their p95 meets it.
+
+    Returns:
+        dict: {scenario: {'iterations', 'p50_ms', 'p95_ms', 'mean_ms', 'max_ms',
+                          'sql_p50', 'sql_p95', 'sql_max'[, 'target_p95_ms', 'meets_target']}}
+    """
+    rng = random.Random(seed)
+    result, _sql_count = scenario_login(client, dataset, rng, 0)
+    if not result.get('success'):
+        raise AssertionError(f"Benchmark login failed: {result}")
+    client.token = result['token']
+
+    report = {}
+    for name, scenario in scenarios:
+        durations = []
+        sql_counts = []
+        for iteration in range(warmup + iterations):
+            start = time.perf_counter()
+            result, sql_count = scenario(client, dataset, rng, iteration)
+            duration = (time.perf_counter() - start) * 1000
+            if not result.get('success'):
+                raise AssertionError(f"Benchmark scenario {name} failed: {result}")
+            if iteration < warmup:
+                continue
+            durations.append(duration)
+            if sql_count is not None:
+                sql_counts.append(sql_count)
+
+        report[name] = {
+            'iterations': iterations,
+            'p50_ms': round(percentile(durations, 50), 2),
+            'p95_ms': round(percentile(durations, 95), 2),
+            'mean_ms': round(sum(durations) / len(durations), 2),
+            'max_ms': round(max(durations), 2),
+            'sql_p50': percentile(sql_counts, 50),
+            'sql_p95': percentile(sql_counts, 95),
+            'sql_max': max(sql_counts) if sql_counts else None,
+        }
+        _logger.info(
+            f"Benchmark {name}: p50 {report[name]['p50_ms']} ms, p95 {report[name]['p95_ms']} ms, "
+            f"SQL p50 {report[name]['sql_p50']}"
+        )
+
+        target = P95_TARGETS_MS.get(name)
+        if target is not None:
+            report[name].update(target_p95_ms=target, meets_target=report[name]['p95_ms'] <= target)
+            if not report[name]['meets_target']:
+                _logger.warning(f"Benchmark {name}: p95 {report[name]['p95_ms']} ms above the {target} ms target")
+    return report
+
+
+def write_report(scenario_results, sizes, preset, path=None):
+    """
+    Write the JSON benchmark report
+
+    Args:
+        path (str): target file, defaults to STOCK_SCAN_MOBILE_BENCHMARK_REPORT or
+            <data_dir>/stock_scan_mobile/benchmarks/<timestamp>.json
+
+    Returns:
+        str: path of the report
+    """
+    generated_at = datetime.utcnow()
+    path = path or os.environ.get('STOCK_SCAN_MOBILE_BENCHMARK_REPORT') or os.path.join(
+        config['data_dir'], 'stock_scan_mobile', 'benchmarks', f"{generated_at:%Y%m%dT%H%M%S}.json"
+    )
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'generated_at': generated_at.isoformat(),
+            'preset': preset,
+            'sizes': sizes,
+            'scenarios': scenario_results,
+        }, f, indent=2, sort_keys=True)
+    _logger.info(f"Benchmark report written to {path}")
+    return path
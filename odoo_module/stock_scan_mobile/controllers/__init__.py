@@ -4,3 +4,6 @@ from . import auth_controller
 from . import picking_controller
 from . import serial_controller
 from . import health_controller
+from . import export_controller
+from . import product_controller
+from . import metrics_controller
@@ -1,9 +1,6 @@
 # -*- coding: utf-8 -*-
 
-import json
 import logging
-import secrets
-from datetime import datetime, timedelta
 from werkzeug.exceptions import BadRequest, Unauthorized
 
 from odoo import http, fields
@@ -24,7 +21,8 @@ class AuthController(http.Controller):
         Expected payload:
         {
             "username": "user@example.com",
-            "password": "password123"
+            "password": "password123",
+            "device_id": "HANDHELD-01"  // optional
         }
         
         Returns:
@@ -74,21 +72,11 @@ class AuthController(http.Controller):
                 }
             
             # Generate access token
-            token = self._generate_access_token()
-            expires_at = datetime.now() + timedelta(hours=24)  # Token valid for 24 hours
-            
-            # Store token in database (you might want to create a custom model for this)
-            # For now, we'll use ir.config_parameter as a simple storage
-            token_key = f"mobile_token_{uid}"
-            request.env['ir.config_parameter'].sudo().set_param(
-                token_key, 
-                json.dumps({
-                    'token': token,
-                    'user_id': uid,
-                    'expires_at': expires_at.isoformat(),
-                    'created_at': datetime.now().isoformat()
-                })
+            token_info = request.env['stock_scan_mobile.token'].sudo().issue_token(
+                uid, device_id=data.get('device_id')
             )
+            token = token_info['token']
+            expires_at = token_info['expires_at']
             
             _logger.info(f"Successful login for user: {username} (ID: {uid})")
             
@@ -185,11 +173,9 @@ class AuthController(http.Controller):
             
             if token:
                 # Find and remove token
-                user_data = self._validate_token(token)
-                if user_data:
-                    token_key = f"mobile_token_{user_data['user_id']}"
-                    request.env['ir.config_parameter'].sudo().set_param(token_key, False)
-                    _logger.info(f"User {user_data['user_id']} logged out successfully")
+                user_id = request.env['stock_scan_mobile.token'].sudo().revoke(token)
+                if user_id:
+                    _logger.info(f"User {user_id} logged out successfully")
             
             return {
                 'success': True,
@@ -204,34 +190,16 @@ class AuthController(http.Controller):
                 'error_code': 'SERVER_ERROR'
             }
 
-    def _generate_access_token(self):
-        """Generate a secure access token"""
-        return secrets.token_urlsafe(32)
-
     def _validate_token(self, token):
         """Validate access token and return user data if valid"""
         try:
-            # Search for token in all stored tokens
-            config_params = request.env['ir.config_parameter'].sudo().search([
-                ('key', 'like', 'mobile_token_%')
-            ])
-            
-            for param in config_params:
-                try:
-                    token_data = json.loads(param.value)
-                    if token_data.get('token') == token:
-                        # Check if token is expired
-                        expires_at = datetime.fromisoformat(token_data['expires_at'])
-                        if datetime.now() < expires_at:
-                            return token_data
-                        else:
-                            # Token expired, remove it
-                            param.sudo().unlink()
-                            return None
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
-            
-            return None
+            token_data = request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+            if not token_data:
+                return None
+            return {
+                'user_id': token_data['user_id'],
+                'expires_at': token_data['expires_at'].isoformat()
+            }
             
         except Exception as e:
             _logger.error(f"Token validation error: {str(e)}")
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from datetime import datetime
+
+import odoo
+from odoo import http, api, SUPERUSER_ID
+from odoo.http import request
+
+from ..models.stock_picking import MOBILE_READY_STATES
+from ..tools import gzip_stream, negotiate_encoding
+
+_logger = logging.getLogger(__name__)
+
+
+class ExportController(http.Controller):
+    """Bulk data export for device provisioning"""
+
+    @http.route('/api/export/provisioning', type='http', auth='none', methods=['GET'], csrf=False, cors='*')
+    def export_provisioning(self, **kwargs):
+        """
+        Stream everything a new handheld needs as newline-delimited JSON
+
+        Parameters:
+        - token: Authentication token (or "Authorization: Bearer <token>" header)
+        - batch_size: number of records read per query (default: 200, max: 1000)
+
+        Every line is a JSON object with a "type" key:
+        {"type": "header", "generated_at": "...", "database": "..."}
+        {"type": "picking", "data": { ... same format as /api/pickings ... }}
+        {"type": "serial", "data": { ... same format as /api/serial/check ... }}
+        {"type": "footer", "pickings": 120, "serials": 5400}
+
+        Serials are the available lots of the products of outgoing pickings.
+        Records are read in fixed-size batches, so memory use does not depend
+        on the size of the warehouse. The stream is gzip-compressed when gzip is
+        the encoding preferred by the "Accept-Encoding" header of the client.
+        """
+        token = kwargs.get('token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+
+        token_data = token and request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+        if not token_data:
+            response = request.make_response(
+                json.dumps({
+                    'success': False,
+                    'error': 'Invalid or expired token',
+                    'error_code': 'INVALID_TOKEN'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            response.status_code = 401
+            return response
+
+        try:
+            batch_size = max(1, min(int(kwargs.get('batch_size', 200)), 1000))
+        except ValueError:
+            batch_size = 200
+
+        dbname = request.env.cr.dbname
+        body = self._iter_provisioning(dbname, batch_size)
+
+        headers = {
+            'Content-Type': 'application/x-ndjson; charset=utf-8',
+            'Cache-Control': 'no-store',
+            'Vary': 'Accept-Encoding',
+        }
+        # Streams are only gzip-compressed: clients preferring deflate get identity
+        if negotiate_encoding(request.httprequest.headers.get('Accept-Encoding')) == 'gzip':
+            body = gzip_stream(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        _logger.info(f"Provisioning export started for user {token_data['user_id']}")
+
+        response = request.make_response(body, headers=headers)
+        response.direct_passthrough = True
+        return response
+
+    def _iter_provisioning(self, dbname, batch_size):
+        """
+        Generate the export lines
+
+        The generator runs after the request cursor is closed, so it reads
+        through its own cursor, and empties the environment cache after every
+        batch to keep memory flat.
+        """
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            Picking = env['stock.picking']
+            Lot = env['stock.production.lot']
+
+            def line(data):
+                return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+
+            yield line({
+                'type': 'header',
+                'generated_at': datetime.utcnow().isoformat(),
+                'database': dbname
+            })
+
+            # Open pickings, by increasing ID
+            picking_count = 0
+            outgoing_product_ids = set()
+            last_id = 0
+            while True:
+                pickings = Picking.search([
+                    ('state', 'in', MOBILE_READY_STATES),
+                    ('id', '>', last_id)
+                ], order='id', limit=batch_size)
+                if not pickings:
+                    break
+
+                last_id = pickings[-1].id
+                for picking_data in pickings._format_for_mobile_batch():
+                    if picking_data['operation_type'] == 'out':
+                        outgoing_product_ids.update(product['id'] for product in picking_data['products'])
+                    picking_count += 1
+                    yield line({'type': 'picking', 'data': picking_data})
+
+                Picking.invalidate_cache()
+
+            # Serials that can be picked for the outgoing pickings
+            serial_count = 0
+            last_name, last_id = '', 0
+            while True:
+                lot_ids = Lot._get_available_lot_ids(
+                    outgoing_product_ids, after_name=last_name, after_id=last_id, limit=batch_size)
+                if not lot_ids:
+                    break
+
+                lots = Lot.browse(lot_ids)
+                last_name, last_id = lots[-1].name, lots[-1].id
+                serial_info = lots._get_mobile_serial_info()
+                for lot_id in lot_ids:
+                    serial_count += 1
+                    yield line({'type': 'serial', 'data': serial_info[lot_id]})
+
+                Lot.invalidate_cache()
+
+            yield line({
+                'type': 'footer',
+                'pickings': picking_count,
+                'serials': serial_count
+            })
+
+            _logger.info(f"Provisioning export finished: {picking_count} pickings, {serial_count} serials")
@@ -38,7 +38,7 @@ class HealthController(http.Controller):
             }
             
             return request.make_response(
-                json.dumps(response_data, ensure_ascii=False, indent=2),
+                json.dumps(response_data, ensure_ascii=False, separators=(',', ':')),
                 headers=headers
             )
             
@@ -60,7 +60,7 @@ class HealthController(http.Controller):
             }
             
             response = request.make_response(
-                json.dumps(error_response, ensure_ascii=False, indent=2),
+                json.dumps(error_response, ensure_ascii=False, separators=(',', ':')),
                 headers=headers
             )
             response.status_code = 500
@@ -101,7 +101,7 @@ class HealthController(http.Controller):
             }
             
             return request.make_response(
-                json.dumps(response_data, ensure_ascii=False, indent=2),
+                json.dumps(response_data, ensure_ascii=False, separators=(',', ':')),
                 headers=headers
             )
             
@@ -120,7 +120,7 @@ class HealthController(http.Controller):
             }
             
             response = request.make_response(
-                json.dumps(error_response, ensure_ascii=False, indent=2),
+                json.dumps(error_response, ensure_ascii=False, separators=(',', ':')),
                 headers=headers
             )
             response.status_code = 500
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+import hmac
+import json
+import logging
+
+from odoo import http
+from odoo.http import request
+
+from ..tools import get_spool, render_prometheus, get_slow_request_log
+
+_logger = logging.getLogger(__name__)
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+class MetricsController(http.Controller):
+    """Monitoring of the mobile API"""
+
+    @http.route('/api/metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def metrics(self, **kwargs):
+        """
+        Metrics of all /api/* routes in the Prometheus text format
+        
+        Exposed series (summed over all the workers of this server):
+        - stock_scan_mobile_requests_total{route, method, status}
+        - stock_scan_mobile_request_duration_seconds{route} (histogram)
+        - stock_scan_mobile_request_sql_queries{route} (histogram)
+        - stock_scan_mobile_request_bytes / _response_bytes{route} (histograms)
+        - stock_scan_mobile_errors_total{route, error_code}
+        - stock_scan_mobile_auth_cache_hits_total / _misses_total
+        - stock_scan_mobile_barcode_cache_hits_total / _misses_total
+        
+        When the stock_scan_mobile.metrics_token parameter is set, scrapers
+        must send "Authorization: Bearer <metrics_token>"; otherwise only
+        requests from the server itself are answered.
+        """
+        expected = request.env['ir.config_parameter'].sudo().get_param('stock_scan_mobile.metrics_token')
+        if expected:
+            authorization = request.httprequest.headers.get('Authorization', '')
+            allowed = hmac.compare_digest(authorization, f'Bearer {expected}')
+        else:
+            allowed = request.httprequest.remote_addr in LOOPBACK_ADDRESSES
+        
+        if not allowed:
+            response = request.make_response(
+                json.dumps({
+                    'success': False,
+                    'error': 'Access to metrics denied',
+                    'error_code': 'ACCESS_DENIED'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            response.status_code = 403
+            return response
+        
+        try:
+            body = render_prometheus(get_spool().collect())
+        except Exception as e:
+            _logger.error(f"Error collecting metrics: {str(e)}")
+            response = request.make_response(
+                json.dumps({
+                    'success': False,
+                    'error': 'Internal server error',
+                    'error_code': 'SERVER_ERROR'
+                }),
+                headers={'Content-Type': 'application/json'}
+            )
+            response.status_code = 500
+            return response
+        
+        return request.make_response(body, headers={
+            'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+            'Cache-Control': 'no-store',
+        })
+
+    @http.route('/api/admin/slow_requests', type='json', auth='none', methods=['POST'], csrf=False, cors='*')
+    def slow_requests(self, **kwargs):
+        """
+        Most recent slow (or cProfile-sampled) /api/* requests of all workers
+        
+        Requests are only captured while the stock_scan_mobile.profiling_enabled
+        parameter is set. Reserved to users of the Settings group.
+        
+        Expected payload:
+        {
+            "token": "access_token_here",
+            "limit": 20  // optional, max 100
+        }
+        
+        Returns:
+        {
+            "success": true,
+            "requests": [
+                {
+                    "date": "2024-01-01T10:00:00",
+                    "route": "/api/pickings/<id>/update_sn",
+                    "method": "POST",
+                    "status": 200,
+                    "duration_ms": 812.4,
+                    "sql_count": 57,
+                    "sql_time_ms": 640.2,
+                    "slowest_queries": [{"duration_ms": 512.0, "query": "SELECT ..."}],
+                    "cprofile": null  // text report when sampled
+                }
+            ]
+        }
+        """
+        try:
+            data = request.jsonrequest or {}
+            
+            user_id = self._authenticate_token(data.get('token'))
+            if not user_id:
+                return {
+                    'success': False,
+                    'error': 'Invalid or expired token',
+                    'error_code': 'INVALID_TOKEN'
+                }
+            
+            if not request.env['res.users'].sudo().browse(user_id).has_group('base.group_system'):
+                return {
+                    'success': False,
+                    'error': 'Access to slow requests denied',
+                    'error_code': 'ACCESS_DENIED'
+                }
+            
+            return {
+                'success': True,
+                'requests': get_slow_request_log().read(int(data.get('limit', 20)))
+            }
+            
+        except Exception as e:
+            _logger.error(f"Error reading slow requests: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Internal server error',
+                'error_code': 'SERVER_ERROR'
+            }
+
+    def _authenticate_token(self, token):
+        """Authenticate request using token and return user ID"""
+        if not token:
+            return None
+        
+        try:
+            token_data = request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+            return token_data['user_id'] if token_data else None
+            
+        except Exception as e:
+            _logger.error(f"Token authentication error: {str(e)}")
+            return None
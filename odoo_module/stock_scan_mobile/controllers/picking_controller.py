@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 
-import json
 import logging
-from datetime import datetime
+
+from psycopg2.errors import DeadlockDetected
+from psycopg2.extensions import TransactionRollbackError
 
 from odoo import http, fields
 from odoo.http import request
 from odoo.exceptions import ValidationError, UserError
 
+from ..tools import check_not_modified
+
 _logger = logging.getLogger(__name__)
 
 
@@ -25,6 +28,11 @@ class PickingController(http.Controller):
         - state: picking state filter (optional)
         - limit: number of records to return (default: 50)
         - offset: offset for pagination (default: 0)
+        - cursor: next_cursor of the previous page (optional, replaces offset)
+        - count: 'exact', 'cached' or 'none' (optional; defaults to 'exact'
+          with offset and 'none' with a cursor)
+        - if_none_match: etag of a previous response (optional, or
+          If-None-Match header)
         
         Returns:
         {
@@ -38,7 +46,9 @@ class PickingController(http.Controller):
                     "scheduled_date": "2024-01-01T10:00:00Z",
                     "origin": "PO001",
                     "destination": "Stock",
+                    "source": "Vendors",
                     "partner_name": "Supplier ABC",
+                    "partner_id": 12,
                     "products": [
                         {
                             "id": 456,
@@ -46,13 +56,22 @@ class PickingController(http.Controller):
                             "default_code": "PROD-A",
                             "quantity": 10,
                             "quantity_done": 0,
-                            "tracking": "serial"
+                            "tracking": "serial",
+                            "uom": "Units",
+                            "move_id": 789,
+                            "barcode": "1234567890123"
                         }
                     ]
                 }
             ],
-            "total_count": 25
+            "total_count": 25,
+            "next_cursor": "opaque_cursor", // null on the last page
+            "etag": "W/\"...\""            // also sent as ETag header
         }
+        
+        When the etag of the page matches If-None-Match, the pickings are not
+        formatted again and the result is only:
+        {"success": true, "unchanged": true, "etag": "W/\"...\""}
         """
         try:
             # Get request data
@@ -62,9 +81,10 @@ class PickingController(http.Controller):
             state = data.get('state')
             limit = data.get('limit', 50)
             offset = data.get('offset', 0)
+            cursor = data.get('cursor')
+            count = data.get('count') or ('none' if cursor else 'exact')
             
             # Authenticate user
-            auth_controller = request.env['stock_scan_mobile.controllers.auth_controller']
             user_id = self._authenticate_token(token)
             if not user_id:
                 return {
@@ -90,45 +110,27 @@ class PickingController(http.Controller):
                 domain.append(('state', 'in', ['assigned', 'partially_available']))
             
             # Get pickings
-            pickings = request.env['stock.picking'].sudo().search(
-                domain, 
-                limit=limit, 
-                offset=offset, 
-                order='scheduled_date desc, id desc'
-            )
+            Picking = request.env['stock.picking'].sudo()
+            try:
+                pickings, next_cursor = Picking._search_mobile_page(domain, limit, offset, cursor)
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'Invalid pagination cursor',
+                    'error_code': 'INVALID_CURSOR'
+                }
             
             # Get total count
-            total_count = request.env['stock.picking'].sudo().search_count(domain)
+            total_count = Picking._count_mobile(domain, count)
+            
+            # Skip formatting when the device already has this page
+            etag = pickings._get_mobile_etag(total_count, next_cursor)
+            not_modified = check_not_modified(etag, data)
+            if not_modified:
+                return not_modified
             
             # Format response
-            picking_data = []
-            for picking in pickings:
-                # Get products in this picking
-                products = []
-                for move in picking.move_ids_without_package:
-                    products.append({
-                        'id': move.product_id.id,
-                        'name': move.product_id.name,
-                        'default_code': move.product_id.default_code or '',
-                        'quantity': move.product_uom_qty,
-                        'quantity_done': move.quantity_done,
-                        'tracking': move.product_id.tracking,
-                        'uom': move.product_uom.name,
-                        'move_id': move.id
-                    })
-                
-                picking_data.append({
-                    'id': picking.id,
-                    'name': picking.name,
-                    'operation_type': 'in' if picking.picking_type_id.code == 'incoming' else 'out',
-                    'state': picking.state,
-                    'scheduled_date': picking.scheduled_date.isoformat() if picking.scheduled_date else None,
-                    'origin': picking.origin or '',
-                    'destination': picking.location_dest_id.complete_name or '',
-                    'partner_name': picking.partner_id.name if picking.partner_id else '',
-                    'products': products,
-                    'total_products': len(products)
-                })
+            picking_data = pickings._format_for_mobile_batch()
             
             _logger.info(f"Retrieved {len(picking_data)} pickings for user {user_id}")
             
@@ -137,7 +139,9 @@ class PickingController(http.Controller):
                 'pickings': picking_data,
                 'total_count': total_count,
                 'limit': limit,
-                'offset': offset
+                'offset': offset,
+                'next_cursor': next_cursor,
+                'etag': etag
             }
             
         except Exception as e:
@@ -148,6 +152,78 @@ class PickingController(http.Controller):
                 'error_code': 'SERVER_ERROR'
             }
 
+    @http.route('/api/pickings/changes', type='json', auth='none', methods=['POST'], csrf=False, cors='*')
+    def get_picking_changes(self, **kwargs):
+        """
+        Get the pickings changed since the last sync
+        
+        Expected payload:
+        {
+            "token": "access_token_here",
+            "cursor": "opaque_cursor",  // omit for the first sync
+            "type": "in",               // optional: 'in' or 'out'
+            "limit": 100                // optional, max 500
+        }
+        
+        Returns:
+        {
+            "success": true,
+            "pickings": [ ... ],        // same format as /api/pickings
+            "removed": [
+                {"id": 124, "state": "done"},
+                {"id": 125, "state": "deleted"}
+            ],
+            "next_cursor": "opaque_cursor",
+            "has_more": false
+        }
+        
+        Devices keep the returned cursor and call again while has_more is true.
+        Changes of the last stock_scan_mobile.sync_settle_seconds are sent
+        again by the next sync, so devices must apply them by picking id.
+        """
+        try:
+            # Get request data
+            data = request.jsonrequest or {}
+            token = data.get('token')
+            cursor = data.get('cursor')
+            picking_type = data.get('type') or 'all'
+            limit = min(int(data.get('limit', 100)), 500)
+            
+            # Authenticate user
+            user_id = self._authenticate_token(token)
+            if not user_id:
+                return {
+                    'success': False,
+                    'error': 'Invalid or expired token',
+                    'error_code': 'INVALID_TOKEN'
+                }
+            
+            try:
+                changes = request.env['stock.picking'].sudo().get_mobile_picking_changes(
+                    cursor=cursor, picking_type=picking_type, limit=limit
+                )
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'Invalid sync cursor',
+                    'error_code': 'INVALID_CURSOR'
+                }
+            
+            _logger.info(
+                f"Delta sync for user {user_id}: {len(changes['pickings'])} changed, "
+                f"{len(changes['removed'])} removed"
+            )
+            
+            return dict(changes, success=True)
+            
+        except Exception as e:
+            _logger.error(f"Error retrieving picking changes: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Internal server error',
+                'error_code': 'SERVER_ERROR'
+            }
+
     @http.route('/api/pickings/<int:picking_id>/update_sn', type='json', auth='none', methods=['POST'], csrf=False, cors='*')
     def update_serial_numbers(self, picking_id, **kwargs):
         """
@@ -169,7 +245,10 @@ class PickingController(http.Controller):
                     "serial_number": "SN002",
                     "location": "A-01-02"
                 }
-            ]
+            ],
+            "validate": false,                // optional: validate even if partially processed
+            "backorder_policy": "backorder",  // optional: 'backorder' or 'no_backorder'
+            "idempotency_key": "uuid"         // optional, or Idempotency-Key header
         }
         
         Returns:
@@ -177,8 +256,21 @@ class PickingController(http.Controller):
             "success": true,
             "processed": 2,
             "errors": [],
-            "picking_state": "done"
+            "picking_state": "assigned",
+            "validation_job_id": 42,       // set when all moves are done, or on "validate"
+            "validation_state": "queued"
         }
+        
+        Fully processed pickings are validated in the background; poll
+        /api/pickings/<id>/validation_status for the outcome. With "validate":
+        true, a partially processed picking is validated too: the remaining
+        quantities go to a backorder, or are cancelled with "no_backorder".
+        
+        When an idempotency key is given, retrying the same upload returns the
+        stored response (with "replayed": true) without processing it again.
+        
+        Uploads conflicting with a concurrent one fail with the error code
+        SERIALIZATION_FAILURE or DEADLOCK_DETECTED and "retryable": true.
         """
         try:
             # Get request data
@@ -204,110 +296,89 @@ class PickingController(http.Controller):
                     'error_code': 'PICKING_NOT_FOUND'
                 }
             
-            processed = 0
-            errors = []
-            
-            # Process each serial number
-            for sn_data in serial_numbers:
-                try:
-                    product_id = sn_data.get('product_id')
-                    move_id = sn_data.get('move_id')
-                    serial_number = sn_data.get('serial_number')
-                    location = sn_data.get('location', '')
-                    
-                    if not all([product_id, move_id, serial_number]):
-                        errors.append({
-                            'serial_number': serial_number or 'Unknown',
-                            'error': 'Missing required fields',
-                            'error_code': 'MISSING_FIELDS'
-                        })
-                        continue
-                    
-                    # Get the move
-                    move = request.env['stock.move'].sudo().browse(move_id)
-                    if not move.exists() or move.picking_id.id != picking_id:
-                        errors.append({
-                            'serial_number': serial_number,
-                            'error': 'Invalid move for this picking',
-                            'error_code': 'INVALID_MOVE'
-                        })
-                        continue
-                    
-                    # Create or get lot/serial number
-                    lot = request.env['stock.production.lot'].sudo().search([
-                        ('name', '=', serial_number),
-                        ('product_id', '=', product_id)
-                    ], limit=1)
-                    
-                    if not lot:
-                        # Create new lot for incoming operations
-                        if picking.picking_type_id.code == 'incoming':
-                            lot = request.env['stock.production.lot'].sudo().create({
-                                'name': serial_number,
-                                'product_id': product_id,
-                                'company_id': picking.company_id.id
-                            })
-                        else:
-                            errors.append({
-                                'serial_number': serial_number,
-                                'error': 'Serial number not found in system',
-                                'error_code': 'SERIAL_NOT_FOUND'
-                            })
-                            continue
-                    
-                    # Create move line
-                    move_line_vals = {
-                        'move_id': move_id,
-                        'product_id': product_id,
-                        'lot_id': lot.id,
-                        'qty_done': 1,
-                        'location_id': move.location_id.id,
-                        'location_dest_id': move.location_dest_id.id,
+            # Replay the stored response of an upload that was already processed
+            idempotency_key = data.get('idempotency_key') or request.httprequest.headers.get('Idempotency-Key')
+            key_record = None
+            if idempotency_key:
+                IdempotencyKey = request.env['stock_scan_mobile.idempotency.key'].sudo()
+                status, value = IdempotencyKey.claim(
+                    idempotency_key, user_id, 'update_sn',
+                    IdempotencyKey._digest({
                         'picking_id': picking_id,
-                    }
-                    
-                    # Add location reference if provided
-                    if location:
-                        move_line_vals['location_name'] = location
-                    
-                    request.env['stock.move.line'].sudo().create(move_line_vals)
-                    processed += 1
-                    
-                except Exception as e:
-                    _logger.error(f"Error processing serial number {serial_number}: {str(e)}")
-                    errors.append({
-                        'serial_number': serial_number,
-                        'error': str(e),
-                        'error_code': 'PROCESSING_ERROR'
+                        'serial_numbers': serial_numbers,
+                        'backorder_policy': data.get('backorder_policy'),
+                        'validate': bool(data.get('validate'))
                     })
+                )
+                if status == 'replay':
+                    _logger.info(f"Replayed update_sn response for picking {picking_id} (key {idempotency_key})")
+                    return dict(value, replayed=True)
+                if status == 'conflict':
+                    return {
+                        'success': False,
+                        'error': 'Idempotency key already used for a different request',
+                        'error_code': 'IDEMPOTENCY_KEY_REUSED'
+                    }
+                if status == 'in_progress':
+                    return {
+                        'success': False,
+                        'error': 'A request with this idempotency key is still being processed',
+                        'error_code': 'IDEMPOTENCY_KEY_IN_PROGRESS'
+                    }
+                key_record = value
             
-            # Try to validate picking if all moves are done
-            try:
-                if picking.state in ['assigned', 'partially_available']:
-                    # Check if all moves have sufficient quantity done
-                    all_done = True
-                    for move in picking.move_ids_without_package:
-                        if move.quantity_done < move.product_uom_qty:
-                            all_done = False
-                            break
-                    
-                    if all_done:
-                        picking.button_validate()
-                        _logger.info(f"Picking {picking.name} validated successfully")
-            except Exception as e:
-                _logger.warning(f"Could not validate picking {picking.name}: {str(e)}")
+            # Record all serial numbers in bulk
+            result = picking._process_mobile_serial_numbers_bulk(serial_numbers)
+            processed = result['processed']
+            errors = result['errors']
+            
+            # Queue the validation of the picking if all moves are done, or
+            # if the device asked for it
+            validation_job = False
+            if picking.state in ['assigned', 'partially_available']:
+                validation_job = picking._try_auto_validate(
+                    data.get('backorder_policy') or 'backorder', user_id=user_id,
+                    partial=bool(data.get('validate'))
+                )
+            
+            # Send the pending updates of the shared moves now rather than at
+            # commit, so that serialization failures and deadlocks are caught
+            # below and answered as retryable
+            request.env['base'].flush()
             
             _logger.info(f"Processed {processed} serial numbers for picking {picking.name}")
             
-            return {
+            response = {
                 'success': True,
                 'processed': processed,
                 'errors': errors,
                 'picking_state': picking.state,
-                'picking_name': picking.name
+                'picking_name': picking.name,
+                'validation_job_id': validation_job.id if validation_job else None,
+                'validation_state': validation_job.state if validation_job else None
+            }
+            if key_record:
+                key_record.store_response(response)
+            
+            return response
+            
+        except TransactionRollbackError as e:
+            # Another device updated the same rows: nothing was saved, the
+            # upload can be sent again as is
+            request.env.cr.rollback()
+            _logger.warning(f"Concurrent update of picking {picking_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Concurrent update, please retry',
+                'error_code': 'DEADLOCK_DETECTED' if isinstance(e, DeadlockDetected) else 'SERIALIZATION_FAILURE',
+                'retryable': True
             }
             
         except Exception as e:
+            # Drop the records already created and the claimed idempotency
+            # key: returning normally would commit them, and a retry would
+            # then process the upload again on top of them
+            request.env.cr.rollback()
             _logger.error(f"Error updating serial numbers: {str(e)}")
             return {
                 'success': False,
@@ -315,33 +386,80 @@ class PickingController(http.Controller):
                 'error_code': 'SERVER_ERROR'
             }
 
+    @http.route('/api/pickings/<int:picking_id>/validation_status', type='json', auth='none', methods=['POST'], csrf=False, cors='*')
+    def get_validation_status(self, picking_id, **kwargs):
+        """
+        Get the status of the latest background validation of a picking
+        
+        Expected payload:
+        {
+            "token": "access_token_here"
+        }
+        
+        Returns:
+        {
+            "success": true,
+            "picking_id": 123,
+            "picking_state": "done",
+            "job": {
+                "id": 42,
+                "state": "done",        // queued, running, done or failed
+                "backorder_policy": "backorder",
+                "error": "",
+                "create_date": "2024-01-01T10:00:00",
+                "date_started": "2024-01-01T10:00:05",
+                "date_done": "2024-01-01T10:00:07"
+            }
+        }
+        """
+        try:
+            data = request.jsonrequest or {}
+            token = data.get('token')
+            
+            # Authenticate user
+            user_id = self._authenticate_token(token)
+            if not user_id:
+                return {
+                    'success': False,
+                    'error': 'Invalid or expired token',
+                    'error_code': 'INVALID_TOKEN'
+                }
+            
+            picking = request.env['stock.picking'].sudo().browse(picking_id)
+            if not picking.exists():
+                return {
+                    'success': False,
+                    'error': 'Picking not found',
+                    'error_code': 'PICKING_NOT_FOUND'
+                }
+            
+            job = request.env['stock_scan_mobile.validation.job'].sudo().search([
+                ('picking_id', '=', picking_id)
+            ], limit=1)
+            
+            return {
+                'success': True,
+                'picking_id': picking_id,
+                'picking_state': picking.state,
+                'job': job._format_for_mobile() if job else None
+            }
+            
+        except Exception as e:
+            _logger.error(f"Error retrieving validation status: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Internal server error',
+                'error_code': 'SERVER_ERROR'
+            }
+
     def _authenticate_token(self, token):
         """Authenticate request using token and return user ID"""
         if not token:
             return None
         
         try:
-            # Search for token in stored tokens
-            config_params = request.env['ir.config_parameter'].sudo().search([
-                ('key', 'like', 'mobile_token_%')
-            ])
-            
-            for param in config_params:
-                try:
-                    token_data = json.loads(param.value)
-                    if token_data.get('token') == token:
-                        # Check if token is expired
-                        expires_at = datetime.fromisoformat(token_data['expires_at'])
-                        if datetime.now() < expires_at:
-                            return token_data['user_id']
-                        else:
-                            # Token expired, remove it
-                            param.sudo().unlink()
-                            return None
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
-            
-            return None
+            token_data = request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+            return token_data['user_id'] if token_data else None
             
         except Exception as e:
             _logger.error(f"Token authentication error: {str(e)}")
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+from odoo import http
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+
+class ProductController(http.Controller):
+    """Product controller for mobile app"""
+
+    @http.route('/api/products/resolve', type='json', auth='none', methods=['POST'], csrf=False, cors='*')
+    def resolve_barcodes(self, **kwargs):
+        """
+        Map scanned barcodes to products
+        
+        Product barcodes, alternative mobile barcodes and packaging barcodes
+        are all resolved with a single indexed query.
+        
+        Expected payload:
+        {
+            "token": "access_token_here",
+            "barcodes": ["1234567890123", "ALT-001", "UNKNOWN"],
+            "location_id": 8,   // optional: stock scope for quantities
+            "warehouse_id": 1   // optional: stock scope for quantities
+        }
+        
+        Returns:
+        {
+            "success": true,
+            "results": [
+                {
+                    "barcode": "1234567890123",
+                    "found": true,
+                    "product": { ... }
+                },
+                {
+                    "barcode": "UNKNOWN",
+                    "found": false
+                }
+            ]
+        }
+        """
+        try:
+            # Get request data
+            data = request.jsonrequest
+            token = data.get('token')
+            barcodes = data.get('barcodes', [])
+            
+            # Authenticate user
+            user_id = self._authenticate_token(token)
+            if not user_id:
+                return {
+                    'success': False,
+                    'error': 'Invalid or expired token',
+                    'error_code': 'INVALID_TOKEN'
+                }
+            
+            if not barcodes:
+                return {
+                    'success': False,
+                    'error': 'Barcodes list is required',
+                    'error_code': 'MISSING_BARCODES'
+                }
+            
+            product_ids = request.env['stock_scan_mobile.barcode.alias'].sudo().resolve(barcodes)
+            
+            # Skip products deleted since their barcodes were cached
+            products = request.env['product.product'].sudo().browse(
+                list(dict.fromkeys(filter(None, product_ids.values())))
+            ).exists()
+            products = dict(zip(products.ids, products._format_for_mobile_batch(
+                location_id=data.get('location_id'),
+                warehouse_id=data.get('warehouse_id')
+            )))
+            
+            results = []
+            for barcode in barcodes:
+                product = products.get(product_ids.get(barcode))
+                if product:
+                    results.append({
+                        'barcode': barcode,
+                        'found': True,
+                        'product': product
+                    })
+                else:
+                    results.append({
+                        'barcode': barcode,
+                        'found': False
+                    })
+            
+            _logger.info(f"Resolved {len(products)} products for {len(barcodes)} barcodes")
+            
+            return {
+                'success': True,
+                'results': results,
+                'total_resolved': sum(1 for result in results if result['found'])
+            }
+            
+        except Exception as e:
+            _logger.error(f"Error resolving barcodes: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Internal server error',
+                'error_code': 'SERVER_ERROR'
+            }
+
+    @http.route('/api/products/<int:product_id>/thumbnail', type='http', auth='none', methods=['GET'], csrf=False, cors='*')
+    def product_thumbnail(self, product_id, **kwargs):
+        """
+        Serve the 128px image of a product (the "image_url" of product payloads)
+        
+        Parameters:
+        - token: Authentication token (or "Authorization: Bearer <token>" header)
+        
+        The response carries a strong ETag (the checksum of the image) and may
+        be cached by the device for a week. Requests sending a matching
+        "If-None-Match" header get an empty 304 response.
+        """
+        token = kwargs.get('token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        
+        if not self._authenticate_token(token):
+            return self._json_error('Invalid or expired token', 'INVALID_TOKEN', 401)
+        
+        attachment_id = request.env['product.product'].sudo().browse(product_id)._get_mobile_image_attachments('128').get(product_id)
+        if not attachment_id:
+            return self._json_error('Product image not found', 'IMAGE_NOT_FOUND', 404)
+        
+        attachment = request.env['ir.attachment'].sudo().browse(attachment_id)
+        headers = [
+            ('ETag', f'"{attachment.checksum}"'),
+            ('Cache-Control', 'private, max-age=604800'),
+        ]
+        
+        if request.httprequest.if_none_match.contains(attachment.checksum):
+            response = request.make_response(b'', headers=headers)
+            response.status_code = 304
+            return response
+        
+        headers.append(('Content-Type', attachment.mimetype or 'image/png'))
+        return request.make_response(attachment.raw, headers=headers)
+
+    def _json_error(self, error, error_code, status):
+        """Build the JSON error response of an http route"""
+        response = request.make_response(
+            json.dumps({
+                'success': False,
+                'error': error,
+                'error_code': error_code
+            }),
+            headers={'Content-Type': 'application/json'}
+        )
+        response.status_code = status
+        return response
+
+    def _authenticate_token(self, token):
+        """Authenticate request using token and return user ID"""
+        if not token:
+            return None
+        
+        try:
+            token_data = request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+            return token_data['user_id'] if token_data else None
+            
+        except Exception as e:
+            _logger.error(f"Token authentication error: {str(e)}")
+            return None
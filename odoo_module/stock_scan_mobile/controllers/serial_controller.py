@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 
-import json
 import logging
-from datetime import datetime
 
 from odoo import http, fields
 from odoo.http import request
 
+from ..tools import check_not_modified
+
 _logger = logging.getLogger(__name__)
 
 
@@ -22,13 +22,15 @@ class SerialController(http.Controller):
         {
             "token": "access_token_here",
             "serial_number": "SN001",
-            "product_id": 456  // optional
+            "product_id": 456,         // optional
+            "if_none_match": "W/\"...\""  // optional: etag of a previous response, or If-None-Match header
         }
         
         Returns:
         {
             "success": true,
             "exists": true,
+            "etag": "W/\"...\"",
             "serial_info": {
                 "id": 123,
                 "name": "SN001",
@@ -41,6 +43,9 @@ class SerialController(http.Controller):
                 "last_move_date": "2024-01-01T10:00:00Z"
             }
         }
+        
+        When the etag matches, the result is only:
+        {"success": true, "unchanged": true, "etag": "W/\"...\""}
         """
         try:
             # Get request data
@@ -73,55 +78,30 @@ class SerialController(http.Controller):
             # Search for lot/serial number
             lot = request.env['stock.production.lot'].sudo().search(domain, limit=1)
             
+            # Skip building the answer when the device already has it
+            etag = lot._get_mobile_etag(serial_number)
+            not_modified = check_not_modified(etag, data)
+            if not_modified:
+                return not_modified
+            
             if not lot:
                 return {
                     'success': True,
                     'exists': False,
-                    'serial_number': serial_number
+                    'serial_number': serial_number,
+                    'etag': etag
                 }
             
             # Get current stock information
-            quants = request.env['stock.quant'].sudo().search([
-                ('lot_id', '=', lot.id),
-                ('location_id.usage', '=', 'internal')
-            ])
-            
-            available_quantity = sum(quants.mapped('available_quantity'))
-            reserved_quantity = sum(quants.mapped('reserved_quantity'))
-            
-            # Get current location (location with highest quantity)
-            current_location = ''
-            if quants:
-                main_quant = max(quants, key=lambda q: q.quantity)
-                current_location = main_quant.location_id.complete_name
-            
-            # Get last move date
-            last_move_date = None
-            last_move = request.env['stock.move.line'].sudo().search([
-                ('lot_id', '=', lot.id)
-            ], order='date desc', limit=1)
-            if last_move:
-                last_move_date = last_move.date.isoformat()
-            
-            serial_info = {
-                'id': lot.id,
-                'name': lot.name,
-                'product_id': lot.product_id.id,
-                'product_name': lot.product_id.name,
-                'product_code': lot.product_id.default_code or '',
-                'current_location': current_location,
-                'available_quantity': available_quantity,
-                'reserved_quantity': reserved_quantity,
-                'last_move_date': last_move_date,
-                'tracking': lot.product_id.tracking
-            }
+            serial_info = lot._get_mobile_serial_info()[lot.id]
             
             _logger.info(f"Serial number check for {serial_number}: exists={True}")
             
             return {
                 'success': True,
                 'exists': True,
-                'serial_info': serial_info
+                'serial_info': serial_info,
+                'etag': etag
             }
             
         except Exception as e:
@@ -141,7 +121,8 @@ class SerialController(http.Controller):
         {
             "token": "access_token_here",
             "serial_numbers": ["SN001", "SN002", "SN003"],
-            "product_id": 456  // optional
+            "product_id": 456,         // optional
+            "if_none_match": "W/\"...\""  // optional: etag of a previous response, or If-None-Match header
         }
         
         Returns:
@@ -157,8 +138,12 @@ class SerialController(http.Controller):
                     "serial_number": "SN002",
                     "exists": false
                 }
-            ]
+            ],
+            "etag": "W/\"...\""
         }
+        
+        When the etag matches, the result is only:
+        {"success": true, "unchanged": true, "etag": "W/\"...\""}
         """
         try:
             # Get request data
@@ -183,81 +168,45 @@ class SerialController(http.Controller):
                     'error_code': 'MISSING_SERIAL_NUMBERS'
                 }
             
-            results = []
+            # Resolve all serial numbers and their stock information in a
+            # fixed number of queries, whatever the size of the batch
+            lots_by_name = request.env['stock.production.lot'].sudo()._search_by_serial_numbers(
+                serial_numbers, product_id
+            )
+            lots = request.env['stock.production.lot'].sudo().browse(
+                [lot.id for lot in lots_by_name.values()]
+            )
             
+            etag = lots._get_mobile_etag(serial_numbers, product_id)
+            not_modified = check_not_modified(etag, data)
+            if not_modified:
+                return not_modified
+            
+            serial_info = lots._get_mobile_serial_info()
+            
+            results = []
             for serial_number in serial_numbers:
-                try:
-                    # Build domain for lot search
-                    domain = [('name', '=', serial_number)]
-                    if product_id:
-                        domain.append(('product_id', '=', product_id))
-                    
-                    # Search for lot/serial number
-                    lot = request.env['stock.production.lot'].sudo().search(domain, limit=1)
-                    
-                    if not lot:
-                        results.append({
-                            'serial_number': serial_number,
-                            'exists': False
-                        })
-                        continue
-                    
-                    # Get current stock information
-                    quants = request.env['stock.quant'].sudo().search([
-                        ('lot_id', '=', lot.id),
-                        ('location_id.usage', '=', 'internal')
-                    ])
-                    
-                    available_quantity = sum(quants.mapped('available_quantity'))
-                    reserved_quantity = sum(quants.mapped('reserved_quantity'))
-                    
-                    # Get current location
-                    current_location = ''
-                    if quants:
-                        main_quant = max(quants, key=lambda q: q.quantity)
-                        current_location = main_quant.location_id.complete_name
-                    
-                    # Get last move date
-                    last_move_date = None
-                    last_move = request.env['stock.move.line'].sudo().search([
-                        ('lot_id', '=', lot.id)
-                    ], order='date desc', limit=1)
-                    if last_move:
-                        last_move_date = last_move.date.isoformat()
-                    
-                    serial_info = {
-                        'id': lot.id,
-                        'name': lot.name,
-                        'product_id': lot.product_id.id,
-                        'product_name': lot.product_id.name,
-                        'product_code': lot.product_id.default_code or '',
-                        'current_location': current_location,
-                        'available_quantity': available_quantity,
-                        'reserved_quantity': reserved_quantity,
-                        'last_move_date': last_move_date,
-                        'tracking': lot.product_id.tracking
-                    }
-                    
+                lot = lots_by_name.get(serial_number)
+                if not lot:
                     results.append({
                         'serial_number': serial_number,
-                        'exists': True,
-                        'serial_info': serial_info
-                    })
-                    
-                except Exception as e:
-                    _logger.error(f"Error checking serial number {serial_number}: {str(e)}")
-                    results.append({
-                        'serial_number': serial_number,
-                        'exists': False,
-                        'error': str(e)
+                        'exists': False
                     })
+                    continue
+                
+                results.append({
+                    'serial_number': serial_number,
+                    'exists': True,
+                    'serial_info': serial_info[lot.id]
+                })
             
             _logger.info(f"Batch serial number check completed for {len(serial_numbers)} items")
             
             return {
                 'success': True,
                 'results': results,
-                'total_checked': len(serial_numbers)
+                'total_checked': len(serial_numbers),
+                'etag': etag
             }
             
         except Exception as e:
@@ -277,7 +226,8 @@ class SerialController(http.Controller):
         {
             "token": "access_token_here",
             "serial_number": "SN001",
-            "limit": 10
+            "limit": 10,
+            "cursor": "opaque_cursor"  // optional: next_cursor of the previous page
         }
         
         Returns:
@@ -292,7 +242,8 @@ class SerialController(http.Controller):
                     "picking_name": "WH/IN/00001",
                     "reference": "PO001"
                 }
-            ]
+            ],
+            "next_cursor": "opaque_cursor"  // null on the last page
         }
         """
         try:
@@ -301,6 +252,7 @@ class SerialController(http.Controller):
             token = data.get('token')
             serial_number = data.get('serial_number')
             limit = data.get('limit', 10)
+            cursor = data.get('cursor')
             
             # Authenticate user
             user_id = self._authenticate_token(token)
@@ -330,30 +282,23 @@ class SerialController(http.Controller):
                     'error_code': 'SERIAL_NOT_FOUND'
                 }
             
-            # Get move lines for this lot
-            move_lines = request.env['stock.move.line'].sudo().search([
-                ('lot_id', '=', lot.id)
-            ], order='date desc', limit=limit)
-            
-            history = []
-            for line in move_lines:
-                history.append({
-                    'date': line.date.isoformat(),
-                    'operation': line.picking_id.picking_type_id.name if line.picking_id else 'Internal Transfer',
-                    'from_location': line.location_id.complete_name,
-                    'to_location': line.location_dest_id.complete_name,
-                    'picking_name': line.picking_id.name if line.picking_id else '',
-                    'reference': line.picking_id.origin if line.picking_id else '',
-                    'quantity': line.qty_done,
-                    'state': line.state
-                })
+            # Get one page of move lines for this lot
+            try:
+                page = lot.get_movement_history_page(limit=limit, cursor=cursor)
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'Invalid pagination cursor',
+                    'error_code': 'INVALID_CURSOR'
+                }
             
             return {
                 'success': True,
                 'serial_number': serial_number,
                 'product_name': lot.product_id.name,
-                'history': history,
-                'total_moves': len(history)
+                'history': page['history'],
+                'total_moves': len(page['history']),
+                'next_cursor': page['next_cursor']
             }
             
         except Exception as e:
@@ -370,27 +315,8 @@ class SerialController(http.Controller):
             return None
         
         try:
-            # Search for token in stored tokens
-            config_params = request.env['ir.config_parameter'].sudo().search([
-                ('key', 'like', 'mobile_token_%')
-            ])
-            
-            for param in config_params:
-                try:
-                    token_data = json.loads(param.value)
-                    if token_data.get('token') == token:
-                        # Check if token is expired
-                        expires_at = datetime.fromisoformat(token_data['expires_at'])
-                        if datetime.now() < expires_at:
-                            return token_data['user_id']
-                        else:
-                            # Token expired, remove it
-                            param.sudo().unlink()
-                            return None
-                except (json.JSONDecodeError, ValueError, KeyError):
-                    continue
-            
-            return None
+            token_data = request.env['stock_scan_mobile.token'].sudo().authenticate(token)
+            return token_data['user_id'] if token_data else None
             
         except Exception as e:
             _logger.error(f"Token authentication error: {str(e)}")
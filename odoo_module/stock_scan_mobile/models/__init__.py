@@ -3,3 +3,12 @@
 from . import stock_picking
 from . import product_product
 from . import stock_production_lot
+from . import stock_quant
+from . import stock_move_line
+from . import mobile_token
+from . import picking_tombstone
+from . import validation_job
+from . import idempotency_key
+from . import barcode_alias
+from . import product_packaging
+from . import ir_http
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api, tools
+from odoo.tools.cache import STAT
+
+from ..tools import metrics
+
+_logger = logging.getLogger(__name__)
+
+
+def _barcode_cache_stats():
+    """ORM cache statistics of barcode resolution, for all databases of this process"""
+    hits = misses = 0
+    for (_dbname, model_name, method), counter in list(STAT.items()):
+        if model_name == 'stock_scan_mobile.barcode.alias' and method.__name__ == '_resolve_barcodes_cached':
+            hits += counter.hit
+            misses += counter.miss
+    return [
+        ('stock_scan_mobile_barcode_cache_hits_total', {}, hits),
+        ('stock_scan_mobile_barcode_cache_misses_total', {}, misses),
+    ]
+
+
+metrics.register_collector(_barcode_cache_stats)
+
+
+class BarcodeAlias(models.Model):
+    """
+    Every barcode that identifies a product: its own barcode, its alternative
+    mobile barcode and the barcodes of its packagings. Kept in sync by
+    product.product and product.packaging so that scans resolve with a
+    single indexed lookup.
+    """
+    _name = 'stock_scan_mobile.barcode.alias'
+    _description = 'Mobile Barcode Alias'
+    _order = 'barcode, id'
+
+    barcode = fields.Char(string='Barcode', required=True, index=True)
+    product_id = fields.Many2one('product.product', string='Product', required=True, index=True, ondelete='cascade')
+    packaging_id = fields.Many2one('product.packaging', string='Packaging', index=True, ondelete='cascade')
+    source = fields.Selection([
+        ('product', 'Product Barcode'),
+        ('alternative', 'Alternative Barcode'),
+        ('packaging', 'Packaging Barcode')
+    ], string='Source', required=True)
+
+    @api.model
+    def _sync_products(self, products):
+        """Rebuild the product and alternative barcode aliases of products"""
+        existing = self.search([
+            ('product_id', 'in', products.ids),
+            ('source', 'in', ('product', 'alternative'))
+        ])
+
+        vals_list = []
+        for product in products:
+            if product.barcode:
+                vals_list.append({'barcode': product.barcode, 'product_id': product.id, 'source': 'product'})
+            if product.mobile_barcode_alt:
+                vals_list.append({'barcode': product.mobile_barcode_alt, 'product_id': product.id, 'source': 'alternative'})
+        self._replace_aliases(existing, vals_list)
+
+    @api.model
+    def _sync_packagings(self, packagings):
+        """Rebuild the aliases of packagings"""
+        existing = self.search([('packaging_id', 'in', packagings.ids)])
+        self._replace_aliases(existing, [{
+            'barcode': packaging.barcode,
+            'product_id': packaging.product_id.id,
+            'packaging_id': packaging.id,
+            'source': 'packaging'
+        } for packaging in packagings if packaging.barcode and packaging.product_id])
+
+    def _replace_aliases(self, existing, vals_list):
+        """
+        Make the aliases ``existing`` match ``vals_list``, only touching the
+        rows that differ
+
+        The resolution cache is cleared, in all workers, only when an alias
+        was added or removed: clear_caches() empties the whole ORM cache of
+        the registry, so product imports must not call it for every record.
+        """
+        def key(vals):
+            return (vals['barcode'], vals['product_id'], vals.get('packaging_id') or False, vals['source'])
+
+        wanted = {key(vals): vals for vals in vals_list}
+        obsolete = self.browse()
+        for alias in existing:
+            alias_key = (alias.barcode, alias.product_id.id, alias.packaging_id.id, alias.source)
+            if wanted.pop(alias_key, None) is None:
+                obsolete |= alias
+
+        if not obsolete and not wanted:
+            return
+        self.create(list(wanted.values()))
+        if obsolete:
+            # unlink() clears the resolution cache
+            obsolete.unlink()
+        else:
+            self.clear_caches()
+
+    def unlink(self):
+        # Barcodes resolved through the removed aliases are cached
+        res = super().unlink()
+        if self:
+            self.clear_caches()
+        return res
+
+    def init(self):
+        # Fill the table on install, and on the upgrade of databases created
+        # before it existed (post_init_hook only runs on install)
+        self.env.cr.execute(f"SELECT 1 FROM {self._table} LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild_all()
+
+    @api.model
+    def _rebuild_all(self):
+        """Rebuild the whole alias table from products and packagings"""
+        self.env['product.product'].flush(['barcode', 'mobile_barcode_alt'])
+        self.env['product.packaging'].flush(['barcode', 'product_id'])
+        self.env.cr.execute(f"""
+            DELETE FROM {self._table};
+            INSERT INTO {self._table} (barcode, product_id, packaging_id, source,
+                                       create_uid, create_date, write_uid, write_date)
+            SELECT barcode, product_id, packaging_id, source,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT barcode, id AS product_id, NULL::integer AS packaging_id, 'product' AS source
+                      FROM product_product WHERE barcode IS NOT NULL AND barcode != ''
+                 UNION ALL
+                    SELECT mobile_barcode_alt, id, NULL, 'alternative'
+                      FROM product_product WHERE mobile_barcode_alt IS NOT NULL AND mobile_barcode_alt != ''
+                 UNION ALL
+                    SELECT barcode, product_id, id, 'packaging'
+                      FROM product_packaging
+                     WHERE barcode IS NOT NULL AND barcode != '' AND product_id IS NOT NULL
+              ) aliases
+        """, {'uid': self.env.uid})
+        self.invalidate_cache()
+        self.clear_caches()
+        _logger.info(f"Rebuilt mobile barcode aliases: {self.env.cr.rowcount} barcodes")
+
+    @api.model
+    def resolve(self, barcodes):
+        """
+        Map scanned barcodes to products
+
+        Results are kept in the ORM cache of each worker, which is cleared
+        on every alias change, including changes made by other workers.
+
+        Args:
+            barcodes (list): scanned barcodes
+
+        Returns:
+            dict: {barcode: product_id or False}
+        """
+        barcodes = tuple(dict.fromkeys(barcode for barcode in barcodes if barcode))
+        if not barcodes:
+            return {}
+        return self._resolve_barcodes_cached(barcodes)
+
+    @tools.ormcache_multi(multi='barcodes')
+    def _resolve_barcodes_cached(self, barcodes):
+        """Resolve the barcodes missing from the cache with a single query (called by ormcache_multi)"""
+        self.flush(['barcode', 'product_id', 'source'])
+        self.env['product.product'].flush(['active', 'mobile_scan_enabled'])
+        self.env.cr.execute(f"""
+            SELECT DISTINCT ON (a.barcode) a.barcode, a.product_id
+              FROM {self._table} a
+              JOIN product_product p ON p.id = a.product_id
+             WHERE a.barcode = ANY(%s)
+               AND p.active
+               AND p.mobile_scan_enabled
+          ORDER BY a.barcode,
+                   CASE a.source WHEN 'product' THEN 0 WHEN 'alternative' THEN 1 ELSE 2 END,
+                   a.id
+        """, [list(barcodes)])
+        result = dict.fromkeys(barcodes, False)
+        result.update(self.env.cr.fetchall())
+        return result
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Responses of mobile uploads, stored under the idempotency key sent by the
+    device so that a retried upload returns the first result instead of
+    running again
+    """
+    _name = 'stock_scan_mobile.idempotency.key'
+    _description = 'Mobile API Idempotency Key'
+    _order = 'id desc'
+
+    key = fields.Char(string='Key', required=True, readonly=True)
+    user_id = fields.Integer(string='User ID', required=True, readonly=True)
+    route = fields.Char(string='Route', required=True, readonly=True)
+    request_digest = fields.Char(string='Request Digest', required=True)
+    response = fields.Text(string='Response')
+    expires_at = fields.Datetime(string='Expires At', required=True, index=True)
+
+    _sql_constraints = [
+        ('key_user_route_unique', 'unique(key, user_id, route)', 'Idempotency key already used'),
+    ]
+
+    @api.model
+    def _digest(self, payload):
+        """Return a stable digest of a request payload"""
+        data = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    @api.model
+    def claim(self, key, user_id, route, request_digest):
+        """
+        Reserve an idempotency key before processing a request
+
+        Args:
+            key (str): idempotency key sent by the client
+            user_id (int): authenticated user
+            route (str): name of the operation
+            request_digest (str): digest of the request payload, see _digest()
+
+        Returns:
+            tuple: (status, value) where status is
+                'new': first use, value is the key record to store the response on
+                'replay': value is the response stored by the first request
+                'conflict': the key was already used for a different payload
+                'in_progress': another request with this key has not finished yet,
+                    or finished without a response
+        """
+        now = fields.Datetime.now()
+        existing = self.search([('key', '=', key), ('user_id', '=', user_id), ('route', '=', route)], limit=1)
+
+        if existing and existing.expires_at <= now:
+            existing.unlink()
+            existing = self.browse()
+
+        if existing:
+            if existing.request_digest != request_digest:
+                return 'conflict', None
+            if existing.response:
+                return 'replay', json.loads(existing.response)
+            # A previous attempt ended without a response: process it again
+            return 'new', existing
+
+        ttl_hours = int(self.env['ir.config_parameter'].sudo().get_param(
+            'stock_scan_mobile.idempotency_ttl_hours', 24))
+        try:
+            # Blocks until a concurrent request holding the same key finishes
+            with self.env.cr.savepoint():
+                record = self.create({
+                    'key': key,
+                    'user_id': user_id,
+                    'route': route,
+                    'request_digest': request_digest,
+                    'expires_at': now + timedelta(hours=ttl_hours),
+                })
+        except psycopg2.IntegrityError:
+            return self._read_concurrent_claim(key, user_id, route, request_digest)
+
+        return 'new', record
+
+    @api.model
+    def _read_concurrent_claim(self, key, user_id, route, request_digest):
+        """
+        Answer a request whose key was claimed by a concurrent request
+
+        The concurrent request has committed by now (the insert waited for
+        it), but its row is not visible in the snapshot of this transaction:
+        read it from a new one, and replay its response if it stored one.
+
+        Returns:
+            tuple: (status, value), as claim()
+        """
+        with self.pool.cursor() as cr:
+            cr.execute(f"""
+                SELECT request_digest, response FROM {self._table}
+                 WHERE key = %s AND user_id = %s AND route = %s
+            """, [key, user_id, route])
+            row = cr.fetchone()
+
+        if row and row[0] != request_digest:
+            return 'conflict', None
+        if row and row[1]:
+            return 'replay', json.loads(row[1])
+        return 'in_progress', None
+
+    def store_response(self, response):
+        """Keep the response of a successful request for replays"""
+        self.ensure_one()
+        self.response = json.dumps(response, default=str)
+
+    @api.model
+    def _gc_expired_keys(self):
+        """Remove expired idempotency keys"""
+        expired = self.search([('expires_at', '<=', fields.Datetime.now())])
+        expired.unlink()
+        _logger.info(f"Removed {len(expired)} expired idempotency keys")
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+import werkzeug.exceptions
+
+from odoo import models, http
+from odoo.http import request
+
+from ..tools import (
+    metrics, get_spool, RequestProfiler, get_slow_request_log,
+    compress_body, decompress_body, negotiate_encoding,
+)
+from ..tools.metrics import LATENCY_BUCKETS, SQL_COUNT_BUCKETS, SIZE_BUCKETS
+
+# Numeric path segments (/api/pickings/42/validation_status) are folded so
+# that every route is a single metric series
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+# Error dicts of the API controllers always start with "success": false
+_FAILURE_MARKER = re.compile(rb'"success": ?false')
+_ERROR_CODE = re.compile(rb'"error_code": ?"([A-Za-z0-9_]+)"')
+
+# Largest request body accepted once decompressed
+MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+# Environ key holding the decompressed size of a request body
+DECOMPRESSED_SIZE_KEY = 'stock_scan_mobile.decompressed_size'
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain', 'text/html')
+
+_logger = logging.getLogger(__name__)
+
+
+def _get_request(root, httprequest):
+    """
+    Decompress the gzip or deflate encoded bodies of /api/* requests.
+
+    JSON-RPC bodies are parsed when Odoo builds the request object, before
+    ir.http dispatches it, hence this wrapper of Root.get_request. The
+    decompressed body replaces the cached data of the werkzeug request, so
+    that both JSON and form parsing read it.
+    """
+    encoding = httprequest.headers.get('Content-Encoding', '').strip().lower()
+    if encoding and encoding != 'identity' and httprequest.path.startswith('/api/'):
+        if encoding not in ('gzip', 'deflate'):
+            raise werkzeug.exceptions.UnsupportedMediaType(f"Unsupported Content-Encoding: {encoding}")
+        try:
+            body = decompress_body(httprequest.get_data(), encoding, MAX_DECOMPRESSED_SIZE)
+        except ValueError as e:
+            _logger.info(f"Rejected compressed request body on {httprequest.path}: {str(e)}")
+            raise werkzeug.exceptions.BadRequest("Invalid compressed request body")
+        httprequest._cached_data = body
+        httprequest.environ[DECOMPRESSED_SIZE_KEY] = len(body)
+    return _get_request.origin(root, httprequest)
+
+
+if not hasattr(http.Root.get_request, 'origin'):
+    _get_request.origin = http.Root.get_request
+    http.Root.get_request = _get_request
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _dispatch(cls):
+        path = request.httprequest.path
+        if not path.startswith('/api/'):
+            return super()._dispatch()
+
+        route = _ID_SEGMENT.sub('/<id>', path)
+        thread = threading.current_thread()
+        query_count = getattr(thread, 'query_count', 0)
+        profiler = cls._get_api_profiler()
+        start = time.perf_counter()
+        response = None
+        body = None
+        try:
+            if profiler:
+                profiler.start()
+            response = super()._dispatch()
+            # Weak ETag computed by the controller, see tools.etag
+            etag = getattr(request, 'stock_scan_mobile_etag', None)
+            if etag and response is not None:
+                response.headers['ETag'] = etag
+            if response is not None:
+                body = cls._compress_api_response(response)
+            return response
+        finally:
+            if profiler:
+                profiler.stop()
+                cls._record_api_profile(route, response, profiler)
+            cls._record_api_metrics(
+                route,
+                response,
+                time.perf_counter() - start,
+                getattr(thread, 'query_count', 0) - query_count,
+                body,
+            )
+
+    @classmethod
+    def _compress_api_response(cls, response):
+        """
+        Compress the body of an /api/* response in the encoding preferred by
+        the client, when it is larger than stock_scan_mobile.compression_min_size
+
+        Returns:
+            bytes: the uncompressed body, or None for streamed responses
+        """
+        if response.is_streamed or response.direct_passthrough:
+            return None
+        body = response.get_data()
+        if response.headers.get('Content-Encoding') or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return body
+
+        try:
+            min_size = int(request.env['ir.config_parameter'].sudo().get_param(
+                'stock_scan_mobile.compression_min_size', 1024))
+        except Exception:
+            min_size = 1024
+        if len(body) < min_size:
+            return body
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.httprequest.headers.get('Accept-Encoding'))
+        if encoding:
+            response.set_data(compress_body(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+        return body
+
+    @classmethod
+    def _get_api_profiler(cls):
+        """Return a profiler for this request when profiling is enabled, None otherwise"""
+        try:
+            ICP = request.env['ir.config_parameter'].sudo()
+            if not ICP.get_param('stock_scan_mobile.profiling_enabled'):
+                return None
+            sample_rate = float(ICP.get_param('stock_scan_mobile.profiling_cprofile_rate', 0))
+            return RequestProfiler(
+                top_queries=int(ICP.get_param('stock_scan_mobile.profiling_top_queries', 5)),
+                cprofile=sample_rate > 0 and random.random() < sample_rate,
+            )
+        except Exception as e:
+            _logger.warning(f"Could not set up API request profiling: {str(e)}")
+            return None
+
+    @classmethod
+    def _record_api_profile(cls, route, response, profiler):
+        """Expose the timings of a request and keep it if it was slow or sampled"""
+        if response is not None:
+            response.headers['X-Request-SQL-Count'] = str(profiler.query_count)
+            response.headers['Server-Timing'] = (
+                f'app;dur={profiler.duration * 1000:.1f}, sql;dur={profiler.query_time * 1000:.1f}'
+            )
+
+        try:
+            slow_ms = int(request.env['ir.config_parameter'].sudo().get_param(
+                'stock_scan_mobile.profiling_slow_ms', 500))
+        except Exception:
+            slow_ms = 500
+        if profiler.duration * 1000 < slow_ms and not profiler.cprofile:
+            return
+
+        get_slow_request_log().add({
+            'timestamp': time.time(),
+            'date': datetime.utcnow().isoformat(),
+            'route': route,
+            'path': request.httprequest.path,
+            'method': request.httprequest.method,
+            'status': getattr(response, 'status_code', 500),
+            'duration_ms': round(profiler.duration * 1000, 1),
+            'sql_count': profiler.query_count,
+            'sql_time_ms': round(profiler.query_time * 1000, 1),
+            'slowest_queries': profiler.slowest_queries(),
+            'cprofile': profiler.cprofile_stats(),
+        })
+
+    @classmethod
+    def _record_api_metrics(cls, route, response, duration, query_count, body=None):
+        """
+        Count one /api/* request in the metrics of this process
+
+        Payload sizes are recorded before compression (*_bytes) and as sent
+        over the network (*_wire_bytes); ``body`` is the uncompressed
+        response body when the response was compressed.
+        """
+        method = request.httprequest.method
+        status = str(getattr(response, 'status_code', 500))
+
+        metrics.inc('stock_scan_mobile_requests_total', {'route': route, 'method': method, 'status': status})
+        metrics.observe('stock_scan_mobile_request_duration_seconds', duration, LATENCY_BUCKETS, {'route': route})
+        metrics.observe('stock_scan_mobile_request_sql_queries', query_count, SQL_COUNT_BUCKETS, {'route': route})
+        wire_size = request.httprequest.content_length or 0
+        metrics.observe('stock_scan_mobile_request_bytes',
+                        request.httprequest.environ.get(DECOMPRESSED_SIZE_KEY, wire_size),
+                        SIZE_BUCKETS, {'route': route})
+        metrics.observe('stock_scan_mobile_request_wire_bytes', wire_size, SIZE_BUCKETS, {'route': route})
+
+        # Streamed responses (provisioning export) have no known size or body
+        if response is not None and not response.is_streamed and not response.direct_passthrough:
+            wire_body = response.get_data()
+            if body is None:
+                body = wire_body
+            metrics.observe('stock_scan_mobile_response_bytes', len(body), SIZE_BUCKETS, {'route': route})
+            metrics.observe('stock_scan_mobile_response_wire_bytes', len(wire_body), SIZE_BUCKETS, {'route': route})
+            if _FAILURE_MARKER.search(body[:128]):
+                match = _ERROR_CODE.search(body)
+                metrics.inc('stock_scan_mobile_errors_total', {
+                    'route': route,
+                    'error_code': match.group(1).decode('ascii') if match else 'UNKNOWN'
+                })
+
+        get_spool().maybe_dump()
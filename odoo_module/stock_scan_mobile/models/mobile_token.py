@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from datetime import datetime, timedelta
+
+from odoo import models, fields, api
+
+from ..tools import TTLCache, metrics
+
+_logger = logging.getLogger(__name__)
+
+# Validated tokens per process: {(dbname, token_hash): {'user_id', 'expires_at'}}
+# Entries live at most TOKEN_CACHE_TTL seconds, which bounds how long another
+# worker may keep accepting a token after it has been revoked.
+TOKEN_CACHE_TTL = 30
+_token_cache = TTLCache(maxsize=4096, ttl=TOKEN_CACHE_TTL)
+
+metrics.register_collector(lambda: [
+    ('stock_scan_mobile_auth_cache_hits_total', {'cache': 'token'}, _token_cache.hits),
+    ('stock_scan_mobile_auth_cache_misses_total', {'cache': 'token'}, _token_cache.misses),
+])
+
+# Last parsed revocation list, keyed by the raw parameter value
+_revoked_cache = {'raw': None, 'jtis': frozenset()}
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class MobileToken(models.Model):
+    _name = 'stock_scan_mobile.token'
+    _description = 'Mobile API Access Token'
+    _order = 'id desc'
+
+    token_hash = fields.Char(string='Token Hash', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', required=True, index=True, ondelete='cascade')
+    device_id = fields.Char(string='Device')
+    expires_at = fields.Datetime(string='Expires At', required=True, index=True)
+
+    _sql_constraints = [
+        ('token_hash_unique', 'unique(token_hash)', 'Mobile access token already exists'),
+    ]
+
+    def init(self):
+        # Tokens used to be stored as one ir.config_parameter per user
+        self.env.cr.execute("DELETE FROM ir_config_parameter WHERE key LIKE 'mobile\\_token\\_%'")
+
+    @api.model
+    def _hash_token(self, token):
+        """Return the digest stored in place of the clear token"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @api.model
+    def _get_token_expiry_hours(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'stock_scan_mobile.token_expiry_hours', 24))
+
+    @api.model
+    def _get_token_mode(self):
+        """Return 'stored' (opaque tokens kept in this table) or 'signed' (stateless HMAC tokens)"""
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'stock_scan_mobile.token_mode', 'stored')
+
+    @api.model
+    def issue_token(self, user_id, device_id=None):
+        """
+        Create a new access token for a user
+
+        In 'signed' mode the token is not stored: it carries its own user,
+        database and expiry, signed with the database secret.
+
+        Args:
+            user_id (int): ID of the authenticated user
+            device_id (str): Optional device identifier
+
+        Returns:
+            dict: clear token and its expiry date
+        """
+        now = fields.Datetime.now()
+        expires_at = now + timedelta(hours=self._get_token_expiry_hours())
+
+        if self._get_token_mode() == 'signed':
+            return {
+                'token': self._issue_signed_token(user_id, expires_at),
+                'expires_at': expires_at,
+            }
+
+        token = secrets.token_urlsafe(32)
+
+        # Keep the table small: drop this user's expired tokens on each login
+        self.search([('user_id', '=', user_id), ('expires_at', '<=', now)]).unlink()
+
+        self.create({
+            'token_hash': self._hash_token(token),
+            'user_id': user_id,
+            'device_id': device_id or False,
+            'expires_at': expires_at,
+        })
+
+        return {
+            'token': token,
+            'expires_at': expires_at,
+        }
+
+    @api.model
+    def authenticate(self, token):
+        """
+        Resolve an access token through the process cache, then the indexed table
+
+        Args:
+            token (str): clear access token sent by the mobile app
+
+        Returns:
+            dict: {'user_id', 'expires_at'} or None if the token is invalid or expired
+        """
+        if not token:
+            return None
+
+        # Opaque tokens never contain a dot, signed ones always do
+        if '.' in token:
+            return self._verify_signed_token(token)
+
+        token_hash = self._hash_token(token)
+        cache_key = (self.env.cr.dbname, token_hash)
+        now = fields.Datetime.now()
+
+        token_data = _token_cache.get(cache_key)
+        if token_data:
+            if token_data['expires_at'] > now:
+                return token_data
+            _token_cache.pop(cache_key)
+
+        record = self.search([('token_hash', '=', token_hash)], limit=1)
+        if not record:
+            return None
+
+        if record.expires_at <= now:
+            # Token expired, remove it
+            record.unlink()
+            return None
+
+        token_data = {
+            'user_id': record.user_id.id,
+            'expires_at': record.expires_at,
+        }
+        _token_cache.set(cache_key, token_data)
+        return token_data
+
+    @api.model
+    def revoke(self, token):
+        """
+        Invalidate an access token
+
+        Returns:
+            int: ID of the user owning the token, or None if it was unknown
+        """
+        if '.' in token:
+            return self._revoke_signed_token(token)
+
+        token_hash = self._hash_token(token)
+        _token_cache.pop((self.env.cr.dbname, token_hash))
+
+        record = self.search([('token_hash', '=', token_hash)], limit=1)
+        if not record:
+            return None
+
+        user_id = record.user_id.id
+        record.unlink()
+        return user_id
+
+    @api.model
+    def _gc_expired_tokens(self):
+        """Remove all expired tokens"""
+        expired = self.search([('expires_at', '<=', fields.Datetime.now())])
+        for record in expired:
+            _token_cache.pop((self.env.cr.dbname, record.token_hash))
+        expired.unlink()
+        _logger.info(f"Removed {len(expired)} expired mobile tokens")
+
+    # Signed tokens
+    # -------------
+    # <payload>.<signature>, both base64url encoded. The payload holds the user
+    # ID (uid), database name (db), expiry timestamp (exp) and a random token ID
+    # (jti) used by the revocation list. Verification only reads
+    # ir.config_parameter values, which are served from the ORM cache, so it
+    # runs without any query once the worker is warm.
+
+    @api.model
+    def _get_signing_secret(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        secret = ICP.get_param('stock_scan_mobile.token_secret')
+        if not secret:
+            secret = secrets.token_hex(32)
+            ICP.set_param('stock_scan_mobile.token_secret', secret)
+        return secret
+
+    @api.model
+    def _sign(self, payload):
+        return hmac.new(self._get_signing_secret().encode('ascii'), payload.encode('ascii'), hashlib.sha256).digest()
+
+    @api.model
+    def _issue_signed_token(self, user_id, expires_at):
+        claims = {
+            'uid': user_id,
+            'db': self.env.cr.dbname,
+            'exp': int((expires_at - datetime(1970, 1, 1)).total_seconds()),
+            'jti': secrets.token_urlsafe(8),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return f"{payload}.{_b64encode(self._sign(payload))}"
+
+    @api.model
+    def _decode_signed_token(self, token):
+        """Return the claims of a correctly signed token, None otherwise"""
+        try:
+            payload, signature = token.split('.')
+            if not hmac.compare_digest(_b64decode(signature), self._sign(payload)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(claims, dict) or not all(key in claims for key in ('uid', 'db', 'exp', 'jti')):
+            return None
+        return claims
+
+    @api.model
+    def _get_revoked_jtis(self):
+        raw = self.env['ir.config_parameter'].sudo().get_param('stock_scan_mobile.revoked_tokens')
+        if not raw:
+            return frozenset()
+        if _revoked_cache['raw'] != raw:
+            _revoked_cache['jtis'] = frozenset(json.loads(raw))
+            _revoked_cache['raw'] = raw
+        return _revoked_cache['jtis']
+
+    @api.model
+    def _verify_signed_token(self, token):
+        claims = self._decode_signed_token(token)
+        if not claims or claims.get('db') != self.env.cr.dbname:
+            return None
+
+        expires_at = datetime.utcfromtimestamp(claims['exp'])
+        if expires_at <= fields.Datetime.now():
+            return None
+
+        # The revocation list is only consulted when something was revoked
+        revoked = self._get_revoked_jtis()
+        if revoked and claims['jti'] in revoked:
+            return None
+
+        return {
+            'user_id': claims['uid'],
+            'expires_at': expires_at,
+        }
+
+    @api.model
+    def _revoke_signed_token(self, token):
+        claims = self._decode_signed_token(token)
+        if not claims or claims.get('db') != self.env.cr.dbname:
+            return None
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        now = int((fields.Datetime.now() - datetime(1970, 1, 1)).total_seconds())
+        revoked = json.loads(ICP.get_param('stock_scan_mobile.revoked_tokens') or '{}')
+
+        # Entries are only needed until the token would have expired anyway
+        revoked = {jti: exp for jti, exp in revoked.items() if exp > now}
+        if claims['exp'] > now:
+            revoked[claims['jti']] = claims['exp']
+
+        ICP.set_param('stock_scan_mobile.revoked_tokens', json.dumps(revoked) if revoked else False)
+        return claims['uid']
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+
+class PickingTombstone(models.Model):
+    """Remembers deleted pickings so that delta syncs can tell devices to drop them"""
+    _name = 'stock_scan_mobile.picking.tombstone'
+    _description = 'Deleted Picking (Mobile Sync)'
+    _order = 'create_date, picking_id'
+
+    picking_id = fields.Integer(string='Picking ID', required=True, index=True)
+    picking_type_code = fields.Char(string='Operation Type Code')
+
+    def init(self):
+        tools.create_index(self.env.cr, 'stock_scan_mobile_picking_tombstone_create_date_idx',
+                           self._table, ['create_date', 'picking_id'])
+
+    @api.model
+    def _gc_tombstones(self, days=30):
+        """Remove markers older than the longest expected offline period of a device"""
+        old = self.search([('create_date', '<', fields.Datetime.now() - timedelta(days=days))])
+        old.unlink()
+        _logger.info(f"Removed {len(old)} picking tombstones")
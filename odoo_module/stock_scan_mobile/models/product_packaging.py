@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class ProductPackaging(models.Model):
+    _inherit = 'product.packaging'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        packagings = super().create(vals_list)
+        packagings_with_barcode = packagings.filtered(lambda packaging: packaging.barcode and packaging.product_id)
+        if packagings_with_barcode:
+            self.env['stock_scan_mobile.barcode.alias'].sudo()._sync_packagings(packagings_with_barcode)
+        return packagings
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'barcode' in vals or 'product_id' in vals:
+            self.env['stock_scan_mobile.barcode.alias'].sudo()._sync_packagings(self)
+        return res
+
+    def unlink(self):
+        # Aliases are removed by the ondelete cascade, without clearing the
+        # resolution cache
+        Alias = self.env['stock_scan_mobile.barcode.alias'].sudo()
+        has_aliases = Alias.search_count([('packaging_id', 'in', self.ids)])
+        res = super().unlink()
+        if has_aliases:
+            Alias.clear_caches()
+        return res
@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import logging
 
+import psycopg2
+
+from ..tools import encode_cursor, decode_cursor
+
 _logger = logging.getLogger(__name__)
 
+# Columns searched with ilike '%term%' by search_for_mobile
+MOBILE_SEARCH_TRGM_COLUMNS = [
+    ('product_product', 'barcode'),
+    ('product_product', 'mobile_barcode_alt'),
+    ('product_product', 'default_code'),
+    ('product_template', 'name'),
+]
+
 
 class ProductProduct(models.Model):
     _inherit = 'product.product'
@@ -13,130 +25,320 @@ class ProductProduct(models.Model):
     mobile_barcode_alt = fields.Char(string='Alternative Barcode', help='Alternative barcode for mobile scanning')
     mobile_scan_enabled = fields.Boolean(string='Mobile Scan Enabled', default=True)
     mobile_location_hint = fields.Char(string='Mobile Location Hint', help='Location hint for mobile users')
+    mobile_has_image = fields.Boolean(
+        string='Has Image', compute='_compute_mobile_has_image', store=True, index=True,
+        help='Whether the product or its template has an image, kept so that mobile payloads never load the image itself')
+
+    def _auto_init(self):
+        """Create and fill mobile_has_image in SQL, rather than computing it by loading every image"""
+        if not tools.column_exists(self.env.cr, 'product_product', 'mobile_has_image'):
+            tools.create_column(self.env.cr, 'product_product', 'mobile_has_image', 'boolean')
+            self.env.cr.execute("""
+                UPDATE product_product p
+                   SET mobile_has_image = EXISTS (
+                        SELECT 1 FROM ir_attachment a
+                         WHERE (a.res_model = 'product.product' AND a.res_field = 'image_variant_1920' AND a.res_id = p.id)
+                            OR (a.res_model = 'product.template' AND a.res_field = 'image_1920' AND a.res_id = p.product_tmpl_id)
+                   )
+            """)
+        return super()._auto_init()
+
+    def init(self):
+        """Create trigram indexes for substring searches when pg_trgm is available"""
+        cr = self.env.cr
+        cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if not cr.fetchone():
+            try:
+                with cr.savepoint():
+                    cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except psycopg2.Error:
+                _logger.info("pg_trgm extension not available: mobile product search will not use trigram indexes")
+                return
+        
+        for table, column in MOBILE_SEARCH_TRGM_COLUMNS:
+            index_name = f'{table}_{column}_mobile_trgm_index'
+            if not tools.index_exists(cr, index_name):
+                cr.execute(f'CREATE INDEX "{index_name}" ON "{table}" USING gin ("{column}" gin_trgm_ops)')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        # New products without barcodes have no alias to create
+        products_with_barcode = products.filtered(lambda product: product.barcode or product.mobile_barcode_alt)
+        if products_with_barcode:
+            self.env['stock_scan_mobile.barcode.alias'].sudo()._sync_products(products_with_barcode)
+        return products
+
+    def write(self, vals):
+        res = super().write(vals)
+        Alias = self.env['stock_scan_mobile.barcode.alias'].sudo()
+        if 'barcode' in vals or 'mobile_barcode_alt' in vals:
+            Alias._sync_products(self)
+        elif ('active' in vals or 'mobile_scan_enabled' in vals) and Alias.search_count([('product_id', 'in', self.ids)]):
+            # Resolved barcodes only point to active, scan-enabled products
+            Alias.clear_caches()
+        return res
+
+    def unlink(self):
+        # The aliases of deleted products go with them (ondelete cascade), but
+        # barcodes resolved to them would stay in the resolution cache
+        Alias = self.env['stock_scan_mobile.barcode.alias'].sudo()
+        has_aliases = Alias.search_count([('product_id', 'in', self.ids)])
+        res = super().unlink()
+        if has_aliases:
+            Alias.clear_caches()
+        return res
+
+    @api.depends('image_variant_1920', 'product_tmpl_id.image_1920')
+    def _compute_mobile_has_image(self):
+        # Look for the image attachments instead of reading the images
+        with_image = set(self._get_mobile_image_attachments('1920'))
+        for product in self:
+            product.mobile_has_image = product.id in with_image
+
+    def _get_mobile_image_attachments(self, size):
+        """
+        Find the image attachments of products, without reading their content
+        
+        The variant image is preferred over the template image, as for image_<size>.
+        
+        Args:
+            size (str): image size, '1920' or '128'
+            
+        Returns:
+            dict: {product_id: attachment_id} for products having an image
+        """
+        ids = [product_id for product_id in self.ids if product_id]
+        if not ids:
+            return {}
+        
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (p.id) p.id, a.id
+              FROM product_product p
+              JOIN ir_attachment a
+                ON (a.res_model = 'product.product' AND a.res_field = %(variant_field)s AND a.res_id = p.id)
+                OR (a.res_model = 'product.template' AND a.res_field = %(template_field)s AND a.res_id = p.product_tmpl_id)
+             WHERE p.id = ANY(%(ids)s)
+          ORDER BY p.id, a.res_model = 'product.product' DESC, a.id DESC
+        """, {
+            'ids': ids,
+            'variant_field': f'image_variant_{size}',
+            'template_field': f'image_{size}',
+        })
+        return dict(self.env.cr.fetchall())
 
     @api.model
-    def search_for_mobile(self, search_term, limit=20):
+    def search_for_mobile(self, search_term, limit=20, location_id=None, warehouse_id=None):
         """
         Search products for mobile app with barcode, name, and reference
         
+        Results are ranked in three tiers, each searched only if the previous
+        ones did not fill the limit:
+        1. exact barcode, alternative barcode or internal reference
+        2. barcode, reference or name starting with the term
+        3. barcode, reference or name containing the term (served by the
+           pg_trgm GIN indexes created in init())
+        
+        Type-ahead target: under 50 ms at the 95th percentile on a catalog of
+        200,000 variants, measured server side by the product_search_* scenarios
+        of the benchmark (large preset).
+        
         Args:
             search_term (str): Search term (barcode, name, or reference)
             limit (int): Maximum number of results
+            location_id (int): Optional location to compute stock in
+            warehouse_id (int): Optional warehouse to compute stock in
             
         Returns:
             list: List of product data formatted for mobile
         """
+        base_domain = [('mobile_scan_enabled', '=', True)]
+        
+        # Exact barcode and reference hits
+        products = self.search(base_domain + [
+            '|', '|',
+            ('barcode', '=', search_term),
+            ('mobile_barcode_alt', '=', search_term),
+            ('default_code', '=', search_term)
+        ], limit=limit)
+        
+        # Prefix matches, then fuzzy matches
+        escaped_term = tools.escape_psql(search_term)
+        for pattern in (f'{escaped_term}%', f'%{escaped_term}%'):
+            if len(products) >= limit:
+                break
+            products |= self.search(base_domain + [
+                ('id', 'not in', products.ids),
+                '|', '|', '|',
+                ('barcode', '=ilike', pattern),
+                ('mobile_barcode_alt', '=ilike', pattern),
+                ('name', '=ilike', pattern),
+                ('default_code', '=ilike', pattern)
+            ], limit=limit - len(products))
+        
+        return products._format_for_mobile_batch(location_id=location_id, warehouse_id=warehouse_id)
+
+    def _get_mobile_stock_quantities(self, location_id=None, warehouse_id=None):
+        """
+        Sum the stock of all products in self with a single read_group
+        
+        Args:
+            location_id (int): Optional location (children included)
+            warehouse_id (int): Optional warehouse
+            
+        Returns:
+            dict: {product_id: (available_quantity, reserved_quantity)}
+            over internal locations within the scope
+        """
+        if not self:
+            return {}
+        
         domain = [
-            ('mobile_scan_enabled', '=', True),
-            '|', '|', '|',
-            ('barcode', 'ilike', search_term),
-            ('mobile_barcode_alt', 'ilike', search_term),
-            ('name', 'ilike', search_term),
-            ('default_code', 'ilike', search_term)
+            ('product_id', 'in', self.ids),
+            ('location_id.usage', '=', 'internal')
         ]
+        if location_id:
+            domain.append(('location_id', 'child_of', location_id))
+        if warehouse_id:
+            domain.append(('location_id.warehouse_id', '=', warehouse_id))
         
-        products = self.search(domain, limit=limit)
+        groups = self.env['stock.quant'].read_group(
+            domain, ['product_id', 'quantity:sum', 'reserved_quantity:sum'], ['product_id'], lazy=False
+        )
+        return {
+            group['product_id'][0]: (group['quantity'] - group['reserved_quantity'], group['reserved_quantity'])
+            for group in groups
+        }
+
+    def _format_for_mobile_batch(self, location_id=None, warehouse_id=None):
+        """
+        Format product data for mobile app, for all products in self at once
+        
+        Args:
+            location_id (int): Optional location to compute stock in
+            warehouse_id (int): Optional warehouse to compute stock in
+            
+        Returns:
+            list: formatted product data, in the order of self
+        """
+        # Get current stock information
+        quantities = self._get_mobile_stock_quantities(location_id=location_id, warehouse_id=warehouse_id)
         
         result = []
-        for product in products:
-            result.append(product._format_for_mobile())
+        for product in self:
+            available_qty, reserved_qty = quantities.get(product.id, (0.0, 0.0))
+            result.append({
+                'id': product.id,
+                'name': product.name,
+                'default_code': product.default_code or '',
+                'barcode': product.barcode or '',
+                'mobile_barcode_alt': product.mobile_barcode_alt or '',
+                'tracking': product.tracking,
+                'uom_name': product.uom_id.name,
+                'available_quantity': available_qty,
+                'reserved_quantity': reserved_qty,
+                'mobile_location_hint': product.mobile_location_hint or '',
+                'image_url': f'/api/products/{product.id}/thumbnail' if product.mobile_has_image else None
+            })
         
         return result
 
-    def _format_for_mobile(self):
+    def _format_for_mobile(self, location_id=None, warehouse_id=None):
         """Format product data for mobile app"""
         self.ensure_one()
-        
-        # Get current stock information
-        stock_quants = self.env['stock.quant'].search([
-            ('product_id', '=', self.id),
-            ('location_id.usage', '=', 'internal')
-        ])
-        
-        available_qty = sum(stock_quants.mapped('available_quantity'))
-        reserved_qty = sum(stock_quants.mapped('reserved_quantity'))
-        
-        return {
-            'id': self.id,
-            'name': self.name,
-            'default_code': self.default_code or '',
-            'barcode': self.barcode or '',
-            'mobile_barcode_alt': self.mobile_barcode_alt or '',
-            'tracking': self.tracking,
-            'uom_name': self.uom_id.name,
-            'available_quantity': available_qty,
-            'reserved_quantity': reserved_qty,
-            'mobile_location_hint': self.mobile_location_hint or '',
-            'image_url': f'/web/image/product.product/{self.id}/image_128' if self.image_1920 else None
-        }
+        return self._format_for_mobile_batch(location_id=location_id, warehouse_id=warehouse_id)[0]
 
     @api.model
-    def get_products_by_barcode(self, barcode):
+    def get_products_by_barcode(self, barcode, location_id=None, warehouse_id=None):
         """
-        Get product by barcode (including alternative barcode)
+        Get product by barcode (including alternative and packaging barcodes)
         
         Args:
             barcode (str): Barcode to search for
+            location_id (int): Optional location to compute stock in
+            warehouse_id (int): Optional warehouse to compute stock in
             
         Returns:
             dict: Product data or None if not found
         """
-        product = self.search([
-            ('mobile_scan_enabled', '=', True),
-            '|',
-            ('barcode', '=', barcode),
-            ('mobile_barcode_alt', '=', barcode)
-        ], limit=1)
+        product_id = self.env['stock_scan_mobile.barcode.alias'].sudo().resolve([barcode]).get(barcode)
         
-        if product:
-            return product._format_for_mobile()
+        if product_id:
+            return self.browse(product_id)._format_for_mobile(location_id=location_id, warehouse_id=warehouse_id)
         
         return None
 
     def get_serial_numbers(self, limit=100):
         """
-        Get serial numbers for this product
+        Get serial numbers for this product, by name
         
         Args:
             limit (int): Maximum number of serial numbers to return
             
         Returns:
-            list: List of serial number data
+            list: List of serial number data (see get_serial_numbers_page
+            to read the following ones)
+        """
+        return self.get_serial_numbers_page(limit=limit)['serial_numbers']
+
+    def get_serial_numbers_page(self, limit=100, cursor=None):
+        """
+        Get one page of the serial numbers of this product, by name
+        
+        Lots, their available quantity and their current location come from
+        a single query on the stored stock fields of stock.production.lot.
+        
+        Args:
+            limit (int): Maximum number of serial numbers to return
+            cursor (str): next_cursor of the previous page
+            
+        Returns:
+            dict: {'serial_numbers': list of serial number data,
+                   'next_cursor': cursor of the next page or None on the last page}
+        
+        Raises:
+            ValueError: if the cursor is invalid
         """
         self.ensure_one()
         
         if self.tracking != 'serial':
-            return []
+            return {'serial_numbers': [], 'next_cursor': None}
         
-        lots = self.env['stock.production.lot'].search([
-            ('product_id', '=', self.id)
-        ], limit=limit, order='name')
+        after_name, after_id = decode_cursor(cursor, 2) if cursor else ('', 0)
         
-        result = []
-        for lot in lots:
-            # Get current stock for this lot
-            quants = self.env['stock.quant'].search([
-                ('lot_id', '=', lot.id),
-                ('location_id.usage', '=', 'internal')
-            ])
-            
-            available_qty = sum(quants.mapped('available_quantity'))
-            current_location = ''
-            
-            if quants:
-                main_quant = max(quants, key=lambda q: q.quantity)
-                current_location = main_quant.location_id.complete_name
-            
-            result.append({
-                'id': lot.id,
-                'name': lot.name,
-                'product_id': self.id,
-                'available_quantity': available_qty,
-                'current_location': current_location,
-                'create_date': lot.create_date.isoformat() if lot.create_date else None
-            })
+        self.env['stock.production.lot'].flush(['name', 'product_id', 'mobile_location_id', 'mobile_available_quantity'])
+        self.env['stock.location'].flush(['complete_name'])
+        self.env.cr.execute("""
+            SELECT lot.id, lot.name, lot.create_date,
+                   COALESCE(lot.mobile_available_quantity, 0), COALESCE(loc.complete_name, '')
+              FROM stock_production_lot lot
+         LEFT JOIN stock_location loc ON loc.id = lot.mobile_location_id
+             WHERE lot.product_id = %(product_id)s
+               AND (lot.name, lot.id) > (%(after_name)s, %(after_id)s)
+          ORDER BY lot.name, lot.id
+             LIMIT %(limit)s
+        """, {
+            'product_id': self.id,
+            'after_name': after_name,
+            'after_id': after_id,
+            'limit': limit,
+        })
+        rows = self.env.cr.fetchall()
         
-        return result
+        result = [{
+            'id': lot_id,
+            'name': name,
+            'product_id': self.id,
+            'available_quantity': available_qty,
+            'current_location': current_location,
+            'create_date': create_date.isoformat() if create_date else None
+        } for lot_id, name, create_date, available_qty, current_location in rows]
+        
+        next_cursor = None
+        if limit and len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        
+        return {'serial_numbers': result, 'next_cursor': next_cursor}
 
     @api.model
     def validate_barcode_format(self, barcode):
@@ -196,17 +398,15 @@ class ProductProduct(models.Model):
                     return {'success': False, 'error': validation['error']}
                 
                 # Check if alternative barcode is already used
-                existing = self.search([
-                    ('id', '!=', self.id),
-                    '|',
+                existing = self.env['stock_scan_mobile.barcode.alias'].sudo().search([
                     ('barcode', '=', alt_barcode),
-                    ('mobile_barcode_alt', '=', alt_barcode)
+                    ('product_id', '!=', self.id)
                 ], limit=1)
                 
                 if existing:
                     return {
                         'success': False, 
-                        'error': f'Barcode already used by product: {existing.name}'
+                        'error': f'Barcode already used by product: {existing.product_id.name}'
                     }
                 
                 vals['mobile_barcode_alt'] = alt_barcode
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class StockMoveLine(models.Model):
+    _inherit = 'stock.move.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(lines.lot_id.ids)
+        return lines
+
+    def write(self, vals):
+        if 'lot_id' not in vals and 'date' not in vals:
+            return super().write(vals)
+        lot_ids = self.lot_id.ids
+        res = super().write(vals)
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(lot_ids + self.lot_id.ids)
+        return res
+
+    def unlink(self):
+        lot_ids = self.lot_id.ids
+        res = super().unlink()
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(lot_ids)
+        return res
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import logging
 
+from psycopg2.extensions import TransactionRollbackError
+
+from ..tools import TTLCache, encode_cursor, decode_cursor, decode_cursor_datetime, make_etag
+
 _logger = logging.getLogger(__name__)
 
+# States in which a picking is shown on the devices
+MOBILE_READY_STATES = ['assigned', 'partially_available']
+
+# Picking counts per (dbname, domain), for clients accepting a slightly stale total
+_count_cache = TTLCache(maxsize=256, ttl=60)
+
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
@@ -22,19 +32,47 @@ class StockPicking(models.Model):
     # Add location reference field for mobile scanning
     mobile_location_reference = fields.Char(string='Mobile Location Reference')
 
+    def init(self):
+        # Used by the delta sync to find pickings and moves changed since a cursor
+        tools.create_index(self.env.cr, 'stock_picking_write_date_id_index',
+                           self._table, ['write_date', 'id'])
+        tools.create_index(self.env.cr, 'stock_move_write_date_index',
+                           'stock_move', ['write_date'])
+        # Keyset pagination of the picking list
+        tools.create_index(self.env.cr, 'stock_picking_scheduled_date_id_index',
+                           self._table, ['scheduled_date DESC', 'id DESC'])
+
+    def unlink(self):
+        self.env['stock_scan_mobile.picking.tombstone'].sudo().create([{
+            'picking_id': picking.id,
+            'picking_type_code': picking.picking_type_id.code,
+        } for picking in self])
+        return super().unlink()
+
     @api.model
-    def get_mobile_pickings(self, picking_type='all', state='assigned', limit=50, offset=0):
+    def get_mobile_pickings(self, picking_type='all', state='assigned', limit=50, offset=0,
+                            cursor=None, count=None):
         """
         Get pickings formatted for mobile app consumption
         
+        Pages are ordered by (scheduled_date desc, id desc). Passing the
+        next_cursor of the previous page reads the following one with an
+        index range scan instead of scanning and discarding offset rows.
+        
         Args:
             picking_type (str): 'in', 'out', or 'all'
             state (str): picking state filter
             limit (int): number of records to return
-            offset (int): offset for pagination
+            offset (int): offset for pagination, ignored when a cursor is given
+            cursor (str): next_cursor returned with the previous page
+            count (str): 'exact', 'cached' (up to a minute old) or 'none';
+                defaults to 'exact' in offset mode and 'none' in cursor mode
             
         Returns:
             dict: formatted picking data
+        
+        Raises:
+            ValueError: if the cursor is invalid
         """
         domain = []
         
@@ -47,62 +85,308 @@ class StockPicking(models.Model):
         # Filter by state
         if state != 'all':
             if state == 'ready':
-                domain.append(('state', 'in', ['assigned', 'partially_available']))
+                domain.append(('state', 'in', MOBILE_READY_STATES))
             else:
                 domain.append(('state', '=', state))
         
         # Get pickings
-        pickings = self.search(domain, limit=limit, offset=offset, order='scheduled_date desc, id desc')
-        total_count = self.search_count(domain)
+        pickings, next_cursor = self._search_mobile_page(domain, limit, offset, cursor)
+        total_count = self._count_mobile(domain, count or ('none' if cursor else 'exact'))
         
         # Format for mobile
-        picking_data = []
-        for picking in pickings:
-            picking_data.append(picking._format_for_mobile())
+        picking_data = pickings._format_for_mobile_batch()
         
         return {
             'pickings': picking_data,
             'total_count': total_count,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': next_cursor
         }
 
-    def _format_for_mobile(self):
-        """Format picking data for mobile app"""
-        self.ensure_one()
+    @api.model
+    def _search_mobile_page(self, domain, limit, offset=0, cursor=None):
+        """
+        Search one page of pickings ordered by (scheduled_date desc, id desc)
         
-        # Get products in this picking
-        products = []
-        for move in self.move_ids_without_package:
-            products.append({
-                'id': move.product_id.id,
-                'name': move.product_id.name,
-                'default_code': move.product_id.default_code or '',
-                'quantity': move.product_uom_qty,
-                'quantity_done': move.quantity_done,
-                'tracking': move.product_id.tracking,
-                'uom': move.product_uom.name,
-                'move_id': move.id,
-                'barcode': move.product_id.barcode or ''
-            })
+        Returns:
+            tuple: (pickings, cursor of the next page or None on the last page)
+        
+        Raises:
+            ValueError: if the cursor is invalid
+        """
+        if cursor:
+            scheduled_date, picking_id = decode_cursor(cursor, 2)
+            scheduled_date = decode_cursor_datetime(scheduled_date)
+            domain = domain + [
+                '|', ('scheduled_date', '<', scheduled_date),
+                '&', ('scheduled_date', '=', scheduled_date), ('id', '<', picking_id)
+            ]
+            offset = 0
+        
+        pickings = self.search(domain, limit=limit, offset=offset, order='scheduled_date desc, id desc')
+        
+        next_cursor = None
+        if limit and len(pickings) == limit:
+            last = pickings[-1]
+            next_cursor = encode_cursor(last.scheduled_date, last.id)
+        return pickings, next_cursor
+
+    @api.model
+    def _count_mobile(self, domain, mode='exact'):
+        """
+        Count pickings matching a domain
+        
+        Args:
+            mode (str): 'exact', 'cached' (reuse a count up to a minute old) or 'none'
+        
+        Returns:
+            int: number of pickings, or None in 'none' mode
+        """
+        if mode == 'none':
+            return None
+        
+        if mode == 'cached':
+            key = (self.env.cr.dbname, repr(domain))
+            total_count = _count_cache.get(key)
+            if total_count is None:
+                total_count = self.search_count(domain)
+                _count_cache.set(key, total_count)
+            return total_count
+        
+        return self.search_count(domain)
+
+    def _get_mobile_etag(self, *values):
+        """
+        Weak ETag of the mobile payload of the pickings in self
+
+        Derived from their IDs, in order, and the latest write date of the
+        pickings and their moves, so that it changes with any data shown on
+        the devices, without formatting the pickings.
+
+        Args:
+            *values: other values of the response (count, cursor...)
+
+        Returns:
+            str: the ETag
+        """
+        write_date = None
+        if self:
+            self.flush(['write_date'])
+            self.env['stock.move'].flush(['write_date', 'picking_id'])
+            self.env.cr.execute("""
+                SELECT GREATEST(MAX(p.write_date), MAX(m.write_date))
+                  FROM stock_picking p
+             LEFT JOIN stock_move m ON m.picking_id = p.id
+                 WHERE p.id = ANY(%s)
+            """, [self.ids])
+            write_date = self.env.cr.fetchone()[0]
+        return make_etag(self.ids, write_date, *values)
+
+    @api.model
+    def get_mobile_picking_changes(self, cursor=None, picking_type='all', limit=100):
+        """
+        Get the pickings changed since a sync cursor
+
+        A picking is changed when it or one of its moves was created or
+        written after the cursor. Changed pickings still in a ready state are
+        returned in full; the others (done, cancelled, deleted...) are returned
+        as tombstones so that the device can drop them. Without a cursor, all
+        ready pickings are returned.
+        
+        Write dates are the start time of the writing transaction, so a change
+        committed after a sync may be stamped before the cursor of that sync.
+        The cursor therefore never goes past the settle horizon (now minus
+        stock_scan_mobile.sync_settle_seconds, the longest expected
+        transaction): changes newer than the horizon are returned, and returned
+        again by the next sync. Devices apply changes by picking ID, so
+        receiving one twice is harmless.
+
+        Args:
+            cursor (str): opaque cursor returned by the previous call
+            picking_type (str): 'in', 'out', or 'all'
+            limit (int): maximum number of changes to return
+
+        Returns:
+            dict: changed pickings, removed pickings and the cursor to use next
+
+        Raises:
+            ValueError: if the cursor is invalid
+        """
+        settle_seconds = int(self.env['ir.config_parameter'].sudo().get_param(
+            'stock_scan_mobile.sync_settle_seconds', 120))
+        self.env.cr.execute(
+            "SELECT (now() AT TIME ZONE 'UTC') - make_interval(secs => %s)", [settle_seconds])
+        horizon = self.env.cr.fetchone()[0]
+        
+        params = {'ready_states': tuple(MOBILE_READY_STATES), 'limit': limit + 1}
+        
+        if cursor:
+            since_date, since_id = decode_cursor(cursor, 2)
+            params.update(since_date=decode_cursor_datetime(since_date), since_id=since_id)
+            candidates = """
+                SELECT id FROM stock_picking WHERE write_date >= %(since_date)s
+                 UNION
+                SELECT picking_id FROM stock_move
+                 WHERE write_date >= %(since_date)s AND picking_id IS NOT NULL
+            """
+            after_cursor = "(changed, id) > (%(since_date)s, %(since_id)s)"
+        else:
+            candidates = "SELECT id FROM stock_picking WHERE state IN %(ready_states)s"
+            after_cursor = "TRUE"
+        
+        type_filter = "TRUE"
+        if picking_type in ('in', 'out'):
+            params['code'] = 'incoming' if picking_type == 'in' else 'outgoing'
+            type_filter = "code = %(code)s"
+        
+        tombstones = ""
+        if cursor:
+            tombstones = """
+                UNION ALL
+                SELECT picking_id, 'deleted', picking_type_code, create_date
+                  FROM stock_scan_mobile_picking_tombstone
+                 WHERE create_date >= %(since_date)s
+            """
+        
+        self.flush(['write_date', 'state', 'picking_type_id'])
+        self.env['stock.move'].flush(['write_date', 'picking_id'])
+        self.env.cr.execute(f"""
+            SELECT id, state, changed FROM (
+                SELECT p.id, p.state, t.code, GREATEST(p.write_date, m.write_date) AS changed
+                  FROM ({candidates}) c
+                  JOIN stock_picking p ON p.id = c.id
+                  JOIN stock_picking_type t ON t.id = p.picking_type_id
+                 CROSS JOIN LATERAL (
+                       SELECT MAX(write_date) AS write_date FROM stock_move WHERE picking_id = p.id
+                 ) m
+                {tombstones}
+            ) changes
+             WHERE {type_filter} AND {after_cursor}
+          ORDER BY changed, id
+             LIMIT %(limit)s
+        """, params)
+        rows = self.env.cr.fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        ready_ids = [picking_id for picking_id, state, changed in rows if state in MOBILE_READY_STATES]
+        removed = [
+            {'id': picking_id, 'state': state}
+            for picking_id, state, changed in rows
+            if state not in MOBILE_READY_STATES
+        ]
+        
+        if rows and rows[-1][2] > horizon:
+            # Transactions still running may yet commit changes stamped before
+            # the last row: resume from the horizon. The page already reached
+            # it, so following has_more would only return the same changes.
+            next_cursor = encode_cursor(horizon, 0)
+            has_more = False
+        elif rows:
+            next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+        elif cursor:
+            next_cursor = cursor
+        else:
+            next_cursor = encode_cursor(horizon, 0)
         
         return {
-            'id': self.id,
-            'name': self.name,
-            'operation_type': 'in' if self.picking_type_id.code == 'incoming' else 'out',
-            'state': self.state,
-            'scheduled_date': self.scheduled_date.isoformat() if self.scheduled_date else None,
-            'origin': self.origin or '',
-            'destination': self.location_dest_id.complete_name or '',
-            'source': self.location_id.complete_name or '',
-            'partner_name': self.partner_id.name if self.partner_id else '',
-            'partner_id': self.partner_id.id if self.partner_id else None,
-            'products': products,
-            'total_products': len(products),
-            'mobile_sync_status': self.mobile_sync_status,
-            'mobile_location_reference': self.mobile_location_reference or ''
+            'pickings': self.browse(ready_ids)._format_for_mobile_batch(),
+            'removed': removed,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }
 
+    def _format_for_mobile_batch(self):
+        """
+        Format all pickings in self for the mobile app
+
+        Moves, products, UoMs, locations, partners and operation types are
+        fetched with one read per model for the whole recordset, then the
+        payload is assembled from plain dicts. The number of queries does not
+        depend on the number of pickings or moves in the page.
+
+        Returns:
+            list: formatted picking data, in the order of self
+        """
+        if not self:
+            return []
+        
+        picking_values = self.read([
+            'name', 'picking_type_id', 'state', 'scheduled_date', 'origin',
+            'location_id', 'location_dest_id', 'partner_id',
+            'mobile_sync_status', 'mobile_location_reference'
+        ], load=False)
+        
+        # Same moves as move_ids_without_package, for all pickings at once
+        move_values = self.env['stock.move'].search_read([
+            ('picking_id', 'in', self.ids),
+            '|', ('package_level_id', '=', False), ('picking_type_entire_packs', '=', False)
+        ], ['picking_id', 'product_id', 'product_uom', 'product_uom_qty', 'quantity_done'], load=False)
+        
+        def read_by_id(model, ids, fnames):
+            records = self.env[model].browse({record_id for record_id in ids if record_id})
+            return {values['id']: values for values in records.read(fnames)}
+        
+        products = read_by_id('product.product', [move['product_id'] for move in move_values],
+                              ['name', 'default_code', 'tracking', 'barcode'])
+        uoms = read_by_id('uom.uom', [move['product_uom'] for move in move_values], ['name'])
+        locations = read_by_id('stock.location', [
+            location_id
+            for picking in picking_values
+            for location_id in (picking['location_id'], picking['location_dest_id'])
+        ], ['complete_name'])
+        partners = read_by_id('res.partner', [picking['partner_id'] for picking in picking_values], ['name'])
+        picking_types = read_by_id('stock.picking.type', [picking['picking_type_id'] for picking in picking_values], ['code'])
+        
+        # Get products in each picking
+        products_by_picking = {picking_id: [] for picking_id in self.ids}
+        for move in move_values:
+            product = products[move['product_id']]
+            products_by_picking[move['picking_id']].append({
+                'id': product['id'],
+                'name': product['name'],
+                'default_code': product['default_code'] or '',
+                'quantity': move['product_uom_qty'],
+                'quantity_done': move['quantity_done'],
+                'tracking': product['tracking'],
+                'uom': uoms[move['product_uom']]['name'],
+                'move_id': move['id'],
+                'barcode': product['barcode'] or ''
+            })
+        
+        result = []
+        for picking in picking_values:
+            products_data = products_by_picking[picking['id']]
+            picking_type = picking_types.get(picking['picking_type_id'], {})
+            partner = partners.get(picking['partner_id'])
+            source = locations.get(picking['location_id'], {})
+            destination = locations.get(picking['location_dest_id'], {})
+            result.append({
+                'id': picking['id'],
+                'name': picking['name'],
+                'operation_type': 'in' if picking_type.get('code') == 'incoming' else 'out',
+                'state': picking['state'],
+                'scheduled_date': picking['scheduled_date'].isoformat() if picking['scheduled_date'] else None,
+                'origin': picking['origin'] or '',
+                'destination': destination.get('complete_name') or '',
+                'source': source.get('complete_name') or '',
+                'partner_name': partner['name'] if partner else '',
+                'partner_id': partner['id'] if partner else None,
+                'products': products_data,
+                'total_products': len(products_data),
+                'mobile_sync_status': picking['mobile_sync_status'],
+                'mobile_location_reference': picking['mobile_location_reference'] or ''
+            })
+        
+        return result
+
+    def _format_for_mobile(self):
+        """Format picking data for mobile app"""
+        self.ensure_one()
+        return self._format_for_mobile_batch()[0]
+
     def update_mobile_sync_status(self, status, error_message=None):
         """Update mobile sync status"""
         self.ensure_one()
@@ -119,13 +403,15 @@ class StockPicking(models.Model):
         _logger.info(f"Updated mobile sync status for picking {self.name}: {status}")
 
     @api.model
-    def process_mobile_serial_numbers(self, picking_id, serial_data_list):
+    def process_mobile_serial_numbers(self, picking_id, serial_data_list, idempotency_key=None):
         """
         Process serial numbers from mobile app
         
         Args:
             picking_id (int): ID of the picking
             serial_data_list (list): List of serial number data
+            idempotency_key (str): Optional key; a call repeating the key of a
+                processed call returns its stored result without processing
             
         Returns:
             dict: Processing results
@@ -134,132 +420,274 @@ class StockPicking(models.Model):
         if not picking.exists():
             return {'success': False, 'error': 'Picking not found'}
         
-        processed = 0
-        errors = []
+        key_record = None
+        if idempotency_key:
+            IdempotencyKey = self.env['stock_scan_mobile.idempotency.key'].sudo()
+            status, value = IdempotencyKey.claim(
+                idempotency_key, self.env.uid, 'process_mobile_serial_numbers',
+                IdempotencyKey._digest({'picking_id': picking_id, 'serial_numbers': serial_data_list})
+            )
+            if status == 'replay':
+                return dict(value, replayed=True)
+            if status == 'conflict':
+                return {'success': False, 'error': 'Idempotency key already used for a different request'}
+            if status == 'in_progress':
+                return {'success': False, 'error': 'A request with this idempotency key is still being processed'}
+            key_record = value
         
         try:
-            for sn_data in serial_data_list:
-                try:
-                    result = picking._process_single_serial_number(sn_data)
-                    if result['success']:
-                        processed += 1
-                    else:
-                        errors.append({
-                            'serial_number': sn_data.get('serial_number', 'Unknown'),
-                            'error': result['error']
-                        })
-                except Exception as e:
-                    _logger.error(f"Error processing serial number: {str(e)}")
-                    errors.append({
-                        'serial_number': sn_data.get('serial_number', 'Unknown'),
-                        'error': str(e)
-                    })
-            
-            # Try to validate picking if all moves are done
-            if picking.state in ['assigned', 'partially_available']:
-                picking._try_auto_validate()
-            
-            picking.update_mobile_sync_status('synced')
-            
-            return {
-                'success': True,
-                'processed': processed,
-                'errors': errors,
-                'picking_state': picking.state
-            }
+            # Undo the records already created if the upload fails, so that
+            # a retry with the same idempotency key does not duplicate them
+            with self.env.cr.savepoint():
+                result = picking._process_mobile_serial_numbers_bulk(serial_data_list)
+                processed = result['processed']
+                errors = result['errors']
+                
+                # Queue the validation of the picking if all moves are done
+                validation_job = False
+                if picking.state in ['assigned', 'partially_available']:
+                    validation_job = picking._try_auto_validate()
+                
+                picking.update_mobile_sync_status('synced')
+                
+                result = {
+                    'success': True,
+                    'processed': processed,
+                    'errors': errors,
+                    'picking_state': picking.state,
+                    'validation_job_id': validation_job.id if validation_job else None
+                }
+                if key_record:
+                    key_record.store_response(result)
+                
+                return result
             
         except Exception as e:
             _logger.error(f"Error processing mobile serial numbers: {str(e)}")
             picking.update_mobile_sync_status('error', str(e))
             return {'success': False, 'error': str(e)}
 
-    def _process_single_serial_number(self, sn_data):
-        """Process a single serial number entry"""
+    def _process_mobile_serial_numbers_bulk(self, serial_data_list):
+        """
+        Record scanned serial numbers on this picking in bulk
+        
+        The payload is validated and deduplicated in memory, then moves, lots
+        and already scanned lines are each resolved with one query, missing
+        lots (incoming pickings only) are created with a single create() and
+        all move lines with another one. The number of statements per scanned
+        unit is constant: Odoo still sends one INSERT per created lot and move
+        line, but no other query per unit.
+        
+        Args:
+            serial_data_list (list): dicts with product_id, move_id,
+                serial_number and optional location keys
+        
+        Returns:
+            dict: {'processed': int, 'errors': [{'serial_number', 'error', 'error_code'}]}
+        """
         self.ensure_one()
         
-        try:
+        errors = []
+        
+        def add_error(serial_number, message, error_code):
+            errors.append({
+                'serial_number': serial_number or 'Unknown',
+                'error': message,
+                'error_code': error_code
+            })
+        
+        # Validate and deduplicate the payload
+        entries = []
+        seen = set()
+        location_ref = None
+        for sn_data in serial_data_list:
             product_id = sn_data.get('product_id')
             move_id = sn_data.get('move_id')
             serial_number = sn_data.get('serial_number')
-            location_ref = sn_data.get('location', '')
             
             if not all([product_id, move_id, serial_number]):
-                return {'success': False, 'error': 'Missing required fields'}
-            
-            # Get the move
-            move = self.env['stock.move'].browse(move_id)
-            if not move.exists() or move.picking_id.id != self.id:
-                return {'success': False, 'error': 'Invalid move for this picking'}
+                add_error(serial_number, 'Missing required fields', 'MISSING_FIELDS')
+                continue
             
-            # Create or get lot/serial number
-            lot = self.env['stock.production.lot'].search([
-                ('name', '=', serial_number),
-                ('product_id', '=', product_id)
-            ], limit=1)
-            
-            if not lot:
-                if self.picking_type_id.code == 'incoming':
-                    # Create new lot for incoming operations
-                    lot = self.env['stock.production.lot'].create({
-                        'name': serial_number,
-                        'product_id': product_id,
-                        'company_id': self.company_id.id
-                    })
-                else:
-                    return {'success': False, 'error': 'Serial number not found in system'}
+            if (move_id, serial_number) in seen:
+                add_error(serial_number, 'Serial number sent twice for this move', 'DUPLICATE_SERIAL')
+                continue
+            seen.add((move_id, serial_number))
             
-            # Check if move line already exists for this lot
-            existing_line = self.env['stock.move.line'].search([
-                ('move_id', '=', move_id),
-                ('lot_id', '=', lot.id),
+            entries.append((product_id, move_id, serial_number))
+            location_ref = sn_data.get('location') or location_ref
+        
+        if not entries:
+            return {'processed': 0, 'errors': errors}
+        
+        # Resolve all moves of this picking in one query
+        moves = {
+            move['id']: move
+            for move in self.env['stock.move'].search_read([
+                ('id', 'in', list({move_id for product_id, move_id, serial_number in entries})),
                 ('picking_id', '=', self.id)
-            ], limit=1)
-            
-            if existing_line:
-                return {'success': False, 'error': 'Serial number already scanned for this move'}
+            ], ['location_id', 'location_dest_id'], load=False)
+        }
+        
+        valid_entries = []
+        for product_id, move_id, serial_number in entries:
+            if move_id not in moves:
+                add_error(serial_number, 'Invalid move for this picking', 'INVALID_MOVE')
+            else:
+                valid_entries.append((product_id, move_id, serial_number))
+        
+        # Resolve all lots in one query
+        Lot = self.env['stock.production.lot']
+        lots = {}
+        for lot in Lot.search_read([
+            ('name', 'in', list({serial_number for product_id, move_id, serial_number in valid_entries})),
+            ('product_id', 'in', list({product_id for product_id, move_id, serial_number in valid_entries}))
+        ], ['name', 'product_id'], order='id', load=False):
+            lots.setdefault((lot['name'], lot['product_id']), lot['id'])
+        
+        # Create the missing lots with a single create()
+        missing = list(dict.fromkeys(
+            (serial_number, product_id)
+            for product_id, move_id, serial_number in valid_entries
+            if (serial_number, product_id) not in lots
+        ))
+        if missing and self.picking_type_id.code == 'incoming':
+            created = self._create_mobile_records(Lot, [{
+                'name': serial_number,
+                'product_id': product_id,
+                'company_id': self.company_id.id
+            } for serial_number, product_id in missing])
+            for key, lot in zip(missing, created):
+                if isinstance(lot, Exception):
+                    lots[key] = lot
+                else:
+                    lots[key] = lot.id
+        
+        # Serial numbers already scanned on this picking, in one query
+        lot_ids = [lot_id for lot_id in lots.values() if isinstance(lot_id, int)]
+        existing_lines = {
+            (line['move_id'], line['lot_id'])
+            for line in self.env['stock.move.line'].search_read([
+                ('picking_id', '=', self.id),
+                ('lot_id', 'in', lot_ids)
+            ], ['move_id', 'lot_id'], load=False)
+        }
+        
+        line_vals = []
+        line_serials = []
+        for product_id, move_id, serial_number in valid_entries:
+            lot_id = lots.get((serial_number, product_id))
+            if lot_id is None:
+                add_error(serial_number, 'Serial number not found in system', 'SERIAL_NOT_FOUND')
+                continue
+            if isinstance(lot_id, Exception):
+                add_error(serial_number, str(lot_id), 'PROCESSING_ERROR')
+                continue
+            if (move_id, lot_id) in existing_lines:
+                add_error(serial_number, 'Serial number already scanned for this move', 'ALREADY_SCANNED')
+                continue
             
-            # Create move line
-            move_line_vals = {
+            move = moves[move_id]
+            line_vals.append({
                 'move_id': move_id,
                 'product_id': product_id,
-                'lot_id': lot.id,
+                'lot_id': lot_id,
                 'qty_done': 1,
-                'location_id': move.location_id.id,
-                'location_dest_id': move.location_dest_id.id,
+                'location_id': move['location_id'],
+                'location_dest_id': move['location_dest_id'],
                 'picking_id': self.id,
-            }
-            
-            # Add location reference if provided
-            if location_ref:
-                self.mobile_location_reference = location_ref
-            
-            self.env['stock.move.line'].create(move_line_vals)
-            
-            return {'success': True}
-            
+            })
+            line_serials.append(serial_number)
+        
+        # Create all move lines with a single create()
+        processed = 0
+        created = self._create_mobile_records(self.env['stock.move.line'], line_vals)
+        for serial_number, line in zip(line_serials, created):
+            if isinstance(line, Exception):
+                add_error(serial_number, str(line), 'PROCESSING_ERROR')
+            else:
+                processed += 1
+        
+        # Add location reference if provided
+        if location_ref and processed:
+            self.mobile_location_reference = location_ref
+        
+        return {'processed': processed, 'errors': errors}
+
+    @api.model
+    def _create_mobile_records(self, model, vals_list):
+        """
+        Create records in one call, falling back to one savepoint per record
+        if the batch fails, so that a single bad entry only fails itself.
+        Concurrency errors (serialization failures, deadlocks) are raised.
+        
+        Returns:
+            list: the created record, or the exception raised, for each vals
+        """
+        if not vals_list:
+            return []
+        
+        try:
+            with self.env.cr.savepoint():
+                return list(model.create(vals_list))
+        except TransactionRollbackError:
+            # Serialization failures and deadlocks fail the whole transaction
+            raise
         except Exception as e:
-            _logger.error(f"Error processing single serial number: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            _logger.warning(f"Batch create of {len(vals_list)} {model._name} failed, retrying one by one: {str(e)}")
+        
+        result = []
+        for vals in vals_list:
+            try:
+                with self.env.cr.savepoint():
+                    result.append(model.create(vals))
+            except TransactionRollbackError:
+                raise
+            except Exception as e:
+                result.append(e)
+        return result
+
+    def _process_single_serial_number(self, sn_data):
+        """Process a single serial number entry"""
+        self.ensure_one()
+        
+        result = self._process_mobile_serial_numbers_bulk([sn_data])
+        if result['errors']:
+            return {'success': False, 'error': result['errors'][0]['error']}
+        return {'success': True}
 
-    def _try_auto_validate(self):
-        """Try to automatically validate picking if all moves are done"""
+    def _try_auto_validate(self, backorder_policy='backorder', user_id=None, partial=False):
+        """
+        Queue the validation of the picking if all moves are done
+        
+        Validation runs in the background (see stock_scan_mobile.validation.job)
+        so that scan uploads return without waiting for it. It runs as
+        ``user_id`` (the current user by default), the scanner who uploaded.
+        
+        Args:
+            backorder_policy (str): 'backorder' or 'no_backorder', what to do
+                with the quantities left when the picking is partially processed
+            user_id (int): user to validate the picking as
+            partial (bool): also validate a partially processed picking, as
+                long as some quantity is done
+        
+        Returns:
+            stock_scan_mobile.validation.job: the queued job, or False
+        """
         self.ensure_one()
         
         try:
-            # Check if all moves have sufficient quantity done
-            all_done = True
-            for move in self.move_ids_without_package:
-                if move.quantity_done < move.product_uom_qty:
-                    all_done = False
-                    break
+            moves = self.move_ids_without_package
+            all_done = all(move.quantity_done >= move.product_uom_qty for move in moves)
+            some_done = any(move.quantity_done for move in moves)
             
-            if all_done:
-                self.button_validate()
-                _logger.info(f"Picking {self.name} auto-validated successfully")
-                return True
+            if all_done or (partial and some_done):
+                return self.env['stock_scan_mobile.validation.job'].sudo().enqueue(
+                    self, backorder_policy=backorder_policy, user_id=user_id or self.env.uid
+                )
             
             return False
             
         except Exception as e:
-            _logger.warning(f"Could not auto-validate picking {self.name}: {str(e)}")
+            _logger.warning(f"Could not queue validation of picking {self.name}: {str(e)}")
             return False
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import logging
 
+from ..tools import encode_cursor, decode_cursor, decode_cursor_datetime, make_etag
+
 _logger = logging.getLogger(__name__)
 
+# Stored stock information, maintained by stock.quant and stock.move.line
+MOBILE_STOCK_FIELDS = [
+    'mobile_location_id',
+    'mobile_available_quantity',
+    'mobile_reserved_quantity',
+    'mobile_last_move_date',
+]
+
 
 class StockProductionLot(models.Model):
     _inherit = 'stock.production.lot'
@@ -15,6 +25,30 @@ class StockProductionLot(models.Model):
     mobile_location_reference = fields.Char(string='Mobile Location Reference')
     mobile_notes = fields.Text(string='Mobile Notes')
 
+    # Stock information read by serial checks, see _refresh_mobile_stock()
+    mobile_location_id = fields.Many2one('stock.location', string='Current Location', readonly=True, index=True,
+                                         help='Internal location holding the highest quantity of this serial')
+    mobile_available_quantity = fields.Float(string='Available Quantity', readonly=True, index=True,
+                                             digits='Product Unit of Measure')
+    mobile_reserved_quantity = fields.Float(string='Reserved Quantity', readonly=True,
+                                            digits='Product Unit of Measure')
+    mobile_last_move_date = fields.Datetime(string='Last Move Date', readonly=True, index=True)
+
+    def _auto_init(self):
+        new_columns = not tools.column_exists(self.env.cr, self._table, 'mobile_available_quantity')
+        res = super()._auto_init()
+        if new_columns:
+            self._recompute_mobile_stock()
+        return res
+
+    def init(self):
+        # Keyset pagination of the serial numbers of a product
+        tools.create_index(self.env.cr, 'stock_production_lot_product_id_name_id_index',
+                           self._table, ['product_id', 'name', 'id'])
+        # Serial history pages and the last move date of every serial check
+        tools.create_index(self.env.cr, 'stock_move_line_lot_id_date_id_index',
+                           'stock_move_line', ['lot_id', 'date DESC', 'id DESC'])
+
     @api.model
     def search_serial_numbers(self, search_term, product_id=None, limit=50):
         """
@@ -35,56 +69,256 @@ class StockProductionLot(models.Model):
 
         lots = self.search(domain, limit=limit, order='name')
 
-        result = []
-        for lot in lots:
-            result.append(lot._format_for_mobile())
+        return lots._format_for_mobile_batch()
+
+    @api.model
+    def _get_available_lot_ids(self, product_ids, location_id=None, after_name='', after_id=0, limit=None):
+        """
+        Get the lots having available stock, straight from stock_quant
+
+        The query bypasses record rules: outside of superuser mode, quants
+        are restricted to the allowed companies, as the multi-company rule
+        of stock.quant does for an ORM search.
+
+        Args:
+            product_ids (list): products to consider
+            location_id (int): Optional location, all internal locations otherwise
+            after_name (str), after_id (int): only return lots after this
+                name and ID (keyset pagination)
+            limit (int): Maximum number of lots
+
+        Returns:
+            list: lot IDs, by name then ID
+        """
+        if not product_ids:
+            return []
+
+        params = {
+            'product_ids': list(product_ids),
+            'after_name': after_name or '',
+            'after_id': after_id or 0,
+            'limit': limit,
+        }
+        if location_id:
+            params['location_id'] = location_id
+            location_filter = "q.location_id = %(location_id)s"
+        else:
+            location_filter = "l.usage = 'internal'"
+        company_filter = "TRUE"
+        if not self.env.su:
+            params['company_ids'] = self.env.companies.ids
+            company_filter = "q.company_id = ANY(%(company_ids)s)"
+
+        self.flush(['name'])
+        self.env['stock.quant'].flush(['product_id', 'lot_id', 'location_id', 'company_id', 'quantity', 'reserved_quantity'])
+        self.env['stock.location'].flush(['usage'])
+        self.env.cr.execute(f"""
+            SELECT lot.id
+              FROM stock_quant q
+              JOIN stock_location l ON l.id = q.location_id
+              JOIN stock_production_lot lot ON lot.id = q.lot_id
+             WHERE q.product_id = ANY(%(product_ids)s)
+               AND (lot.name, lot.id) > (%(after_name)s, %(after_id)s)
+               AND {location_filter}
+               AND {company_filter}
+          GROUP BY lot.name, lot.id
+            HAVING SUM(q.quantity - q.reserved_quantity) > 0
+          ORDER BY lot.name, lot.id
+             LIMIT %(limit)s
+        """, params)
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _refresh_mobile_stock(self, lot_ids):
+        """
+        Recompute the stored stock fields of some lots with a single query
+
+        Called after every quant or move line change touching the lots.
+        The location is the internal location holding the highest quantity.
+        Only the lots whose values change are written, and their write date
+        is bumped, which changes the ETag of the serial checks.
 
+        Args:
+            lot_ids (list): lots to refresh
+        """
+        lot_ids = list(set(lot_ids))
+        if not lot_ids:
+            return
+
+        self.env['stock.quant'].flush(['lot_id', 'location_id', 'quantity', 'reserved_quantity'])
+        self.env['stock.location'].flush(['usage'])
+        self.env['stock.move.line'].flush(['lot_id', 'date'])
+        self.env.cr.execute("""
+            UPDATE stock_production_lot lot
+               SET mobile_location_id = stock.location_id,
+                   mobile_available_quantity = COALESCE(stock.available_quantity, 0),
+                   mobile_reserved_quantity = COALESCE(stock.reserved_quantity, 0),
+                   mobile_last_move_date = last_move.date,
+                   write_date = now() AT TIME ZONE 'UTC'
+              FROM stock_production_lot l
+         LEFT JOIN LATERAL (
+                    SELECT SUM(available_quantity) AS available_quantity,
+                           SUM(reserved_quantity) AS reserved_quantity,
+                           (ARRAY_AGG(location_id ORDER BY quantity DESC, location_id))[1] AS location_id
+                      FROM (
+                            SELECT q.location_id,
+                                   SUM(q.quantity) AS quantity,
+                                   SUM(q.quantity - q.reserved_quantity) AS available_quantity,
+                                   SUM(q.reserved_quantity) AS reserved_quantity
+                              FROM stock_quant q
+                              JOIN stock_location sl ON sl.id = q.location_id
+                             WHERE q.lot_id = l.id
+                               AND sl.usage = 'internal'
+                          GROUP BY q.location_id
+                      ) per_location
+                   ) stock ON TRUE
+         LEFT JOIN LATERAL (
+                    SELECT ml.date FROM stock_move_line ml
+                     WHERE ml.lot_id = l.id
+                  ORDER BY ml.date DESC, ml.id DESC
+                     LIMIT 1
+                   ) last_move ON TRUE
+             WHERE l.id = ANY(%s)
+               AND lot.id = l.id
+               AND (lot.mobile_location_id, lot.mobile_available_quantity,
+                    lot.mobile_reserved_quantity, lot.mobile_last_move_date)
+                   IS DISTINCT FROM
+                   (stock.location_id, COALESCE(stock.available_quantity, 0),
+                    COALESCE(stock.reserved_quantity, 0), last_move.date)
+        """, [lot_ids])
+        self.invalidate_cache(MOBILE_STOCK_FIELDS + ['write_date'], lot_ids)
+
+    @api.model
+    def _recompute_mobile_stock(self, batch_size=5000):
+        """
+        Recompute the stored stock fields of all lots, by batches of IDs
+
+        Use after importing data in SQL or changing the usage of locations:
+            odoo shell -d <db> <<< "env['stock.production.lot']._recompute_mobile_stock(); env.cr.commit()"
+        """
+        last_id = 0
+        count = 0
+        while True:
+            self.env.cr.execute(
+                "SELECT id FROM stock_production_lot WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size]
+            )
+            lot_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not lot_ids:
+                break
+            self._refresh_mobile_stock(lot_ids)
+            last_id = lot_ids[-1]
+            count += len(lot_ids)
+        _logger.info(f"Recomputed mobile stock information of {count} serial numbers")
+
+    def _get_mobile_serial_info(self):
+        """
+        Build the stock information of all lots in self from their stored stock fields
+
+        Returns:
+            dict: {lot_id: serial info dict as returned by /api/serial/check}
+        """
+        lot_values = self.read(['name', 'product_id'] + MOBILE_STOCK_FIELDS, load=False)
+
+        location_ids = {lot['mobile_location_id'] for lot in lot_values if lot['mobile_location_id']}
+        location_names = {
+            location['id']: location['complete_name']
+            for location in self.env['stock.location'].browse(location_ids).read(['complete_name'])
+        }
+
+        products = {
+            product['id']: product
+            for product in self.env['product.product'].browse(
+                {lot['product_id'] for lot in lot_values}
+            ).read(['name', 'default_code', 'tracking'])
+        }
+
+        result = {}
+        for lot in lot_values:
+            product = products[lot['product_id']]
+            last_move_date = lot['mobile_last_move_date']
+            result[lot['id']] = {
+                'id': lot['id'],
+                'name': lot['name'],
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'product_code': product['default_code'] or '',
+                'current_location': location_names.get(lot['mobile_location_id'], ''),
+                'available_quantity': lot['mobile_available_quantity'],
+                'reserved_quantity': lot['mobile_reserved_quantity'],
+                'last_move_date': last_move_date.isoformat() if last_move_date else None,
+                'tracking': product['tracking']
+            }
+        return result
+
+    def _get_mobile_etag(self, *values):
+        """
+        Weak ETag of the serial information of the lots in self
+
+        Derived from their IDs, in order, and the latest write date of the
+        lots and their products, the stored stock fields bumping the write
+        date of the lots, without building the serial information.
+
+        Args:
+            *values: other values of the response (serial numbers asked...)
+
+        Returns:
+            str: the ETag
+        """
+        write_date = None
+        if self:
+            self.flush(['write_date', 'product_id'])
+            self.env['product.product'].flush(['write_date'])
+            self.env['product.template'].flush(['write_date'])
+            self.env.cr.execute("""
+                SELECT GREATEST(MAX(l.write_date), MAX(pp.write_date), MAX(pt.write_date))
+                  FROM stock_production_lot l
+                  JOIN product_product pp ON pp.id = l.product_id
+                  JOIN product_template pt ON pt.id = pp.product_tmpl_id
+                 WHERE l.id = ANY(%s)
+            """, [self.ids])
+            write_date = self.env.cr.fetchone()[0]
+        return make_etag(self.ids, write_date, *values)
+
+    def _format_for_mobile_batch(self):
+        """Format serial number data for mobile app, for all lots in self at once"""
+        serial_info = self._get_mobile_serial_info()
+        
+        result = []
+        for lot in self:
+            data = dict(serial_info[lot.id])
+            data.update({
+                'mobile_last_scanned': lot.mobile_last_scanned.isoformat() if lot.mobile_last_scanned else None,
+                'mobile_scan_count': lot.mobile_scan_count,
+                'mobile_location_reference': lot.mobile_location_reference or '',
+                'mobile_notes': lot.mobile_notes or '',
+                'create_date': lot.create_date.isoformat() if lot.create_date else None
+            })
+            result.append(data)
+        
         return result
 
     def _format_for_mobile(self):
         """Format serial number data for mobile app"""
         self.ensure_one()
-        
-        # Get current stock information
-        quants = self.env['stock.quant'].search([
-            ('lot_id', '=', self.id),
-            ('location_id.usage', '=', 'internal')
-        ])
-        
-        available_quantity = sum(quants.mapped('available_quantity'))
-        reserved_quantity = sum(quants.mapped('reserved_quantity'))
-        
-        # Get current location (location with highest quantity)
-        current_location = ''
-        if quants:
-            main_quant = max(quants, key=lambda q: q.quantity)
-            current_location = main_quant.location_id.complete_name
-        
-        # Get last move date
-        last_move_date = None
-        last_move = self.env['stock.move.line'].search([
-            ('lot_id', '=', self.id)
-        ], order='date desc', limit=1)
-        if last_move:
-            last_move_date = last_move.date.isoformat()
-        
-        return {
-            'id': self.id,
-            'name': self.name,
-            'product_id': self.product_id.id,
-            'product_name': self.product_id.name,
-            'product_code': self.product_id.default_code or '',
-            'current_location': current_location,
-            'available_quantity': available_quantity,
-            'reserved_quantity': reserved_quantity,
-            'last_move_date': last_move_date,
-            'tracking': self.product_id.tracking,
-            'mobile_last_scanned': self.mobile_last_scanned.isoformat() if self.mobile_last_scanned else None,
-            'mobile_scan_count': self.mobile_scan_count,
-            'mobile_location_reference': self.mobile_location_reference or '',
-            'mobile_notes': self.mobile_notes or '',
-            'create_date': self.create_date.isoformat() if self.create_date else None
-        }
+        return self._format_for_mobile_batch()[0]
+
+    @api.model
+    def _search_by_serial_numbers(self, serial_numbers, product_id=None):
+        """
+        Resolve many serial numbers with a single search
+
+        Returns:
+            dict: {serial_number: lot} keeping the first lot (by name, id) for each name
+        """
+        domain = [('name', 'in', list(set(serial_numbers)))]
+        if product_id:
+            domain.append(('product_id', '=', product_id))
+
+        lots_by_name = {}
+        for lot in self.search(domain, order='name, id'):
+            lots_by_name.setdefault(lot.name, lot)
+        return lots_by_name
 
     @api.model
     def check_serial_existence(self, serial_number, product_id=None):
@@ -127,46 +361,120 @@ class StockProductionLot(models.Model):
         Returns:
             list: List of check results
         """
-        results = []
+        lots_by_name = self._search_by_serial_numbers(serial_numbers, product_id)
+        lots = self.browse([lot.id for lot in lots_by_name.values()])
+        serial_info = dict(zip(lots.ids, lots._format_for_mobile_batch()))
         
+        results = []
         for serial_number in serial_numbers:
-            result = self.check_serial_existence(serial_number, product_id)
-            result['serial_number'] = serial_number
-            results.append(result)
+            lot = lots_by_name.get(serial_number)
+            if lot:
+                results.append({
+                    'exists': True,
+                    'serial_info': serial_info[lot.id],
+                    'serial_number': serial_number
+                })
+            else:
+                results.append({
+                    'exists': False,
+                    'serial_number': serial_number
+                })
         
         return results
 
     def get_movement_history(self, limit=20):
         """
-        Get movement history for this serial number
+        Get movement history for this serial number, latest first
         
         Args:
             limit (int): Maximum number of moves to return
             
         Returns:
-            list: List of movement data
+            list: List of movement data (see get_movement_history_page to
+            read the older ones)
+        """
+        return self.get_movement_history_page(limit=limit)['history']
+
+    def get_movement_history_page(self, limit=20, cursor=None):
+        """
+        Get one page of the movement history of this serial number, latest first
+        
+        Move lines are read in one query, then their pickings, operation
+        types, locations and users are each read once for the whole page.
+        
+        Args:
+            limit (int): Maximum number of moves to return
+            cursor (str): next_cursor of the previous page
+            
+        Returns:
+            dict: {'history': list of movement data,
+                   'next_cursor': cursor of the next page or None on the last page}
+        
+        Raises:
+            ValueError: if the cursor is invalid
         """
         self.ensure_one()
         
-        move_lines = self.env['stock.move.line'].search([
-            ('lot_id', '=', self.id)
-        ], order='date desc', limit=limit)
+        domain = [('lot_id', '=', self.id)]
+        if cursor:
+            date, line_id = decode_cursor(cursor, 2)
+            date = decode_cursor_datetime(date)
+            domain += [
+                '|', ('date', '<', date),
+                '&', ('date', '=', date), ('id', '<', line_id)
+            ]
+        
+        lines = self.env['stock.move.line'].search_read(
+            domain,
+            ['date', 'picking_id', 'location_id', 'location_dest_id', 'qty_done', 'state', 'create_uid'],
+            order='date desc, id desc', limit=limit, load=False
+        )
+        
+        pickings = {
+            picking['id']: picking
+            for picking in self.env['stock.picking'].browse(
+                {line['picking_id'] for line in lines if line['picking_id']}
+            ).read(['name', 'origin', 'picking_type_id'], load=False)
+        }
+        operation_names = {
+            picking_type['id']: picking_type['name']
+            for picking_type in self.env['stock.picking.type'].browse(
+                {picking['picking_type_id'] for picking in pickings.values() if picking['picking_type_id']}
+            ).read(['name'])
+        }
+        location_names = {
+            location['id']: location['complete_name']
+            for location in self.env['stock.location'].browse(
+                {line['location_id'] for line in lines} | {line['location_dest_id'] for line in lines}
+            ).read(['complete_name'])
+        }
+        user_names = {
+            user['id']: user['name']
+            for user in self.env['res.users'].browse(
+                {line['create_uid'] for line in lines if line['create_uid']}
+            ).read(['name'])
+        }
         
         history = []
-        for line in move_lines:
+        for line in lines:
+            picking = pickings.get(line['picking_id'])
             history.append({
-                'date': line.date.isoformat(),
-                'operation': line.picking_id.picking_type_id.name if line.picking_id else 'Internal Transfer',
-                'from_location': line.location_id.complete_name,
-                'to_location': line.location_dest_id.complete_name,
-                'picking_name': line.picking_id.name if line.picking_id else '',
-                'reference': line.picking_id.origin if line.picking_id else '',
-                'quantity': line.qty_done,
-                'state': line.state,
-                'user_name': line.create_uid.name if line.create_uid else ''
+                'date': line['date'].isoformat(),
+                'operation': operation_names.get(picking['picking_type_id'], '') if picking else 'Internal Transfer',
+                'from_location': location_names.get(line['location_id'], ''),
+                'to_location': location_names.get(line['location_dest_id'], ''),
+                'picking_name': picking['name'] if picking else '',
+                'reference': (picking['origin'] or '') if picking else '',
+                'quantity': line['qty_done'],
+                'state': line['state'],
+                'user_name': user_names.get(line['create_uid'], '')
             })
         
-        return history
+        next_cursor = None
+        if limit and len(lines) == limit:
+            next_cursor = encode_cursor(lines[-1]['date'], lines[-1]['id'])
+        
+        return {'history': history, 'next_cursor': next_cursor}
 
     def update_mobile_scan_info(self, location_reference=None, notes=None):
         """
@@ -278,27 +586,44 @@ class StockProductionLot(models.Model):
             location_id (int): Optional location filter
             
         Returns:
-            list: List of available serial numbers
+            list: List of available serial numbers, by name (see
+            get_available_serials_for_product_page to read them by page)
         """
-        domain = [('product_id', '=', product_id)]
+        return self.get_available_serials_for_product_page(product_id, location_id=location_id, limit=None)['serials']
+
+    @api.model
+    def get_available_serials_for_product_page(self, product_id, location_id=None, limit=100, cursor=None):
+        """
+        Get one page of the available serial numbers of a product
         
-        lots = self.search(domain)
+        Lots are selected from stock_quant, with the availability and
+        location filters applied in SQL, then formatted together.
         
-        available_serials = []
-        for lot in lots:
-            quant_domain = [
-                ('lot_id', '=', lot.id),
-                ('available_quantity', '>', 0)
-            ]
-            
-            if location_id:
-                quant_domain.append(('location_id', '=', location_id))
-            else:
-                quant_domain.append(('location_id.usage', '=', 'internal'))
-            
-            quants = self.env['stock.quant'].search(quant_domain)
+        Args:
+            product_id (int): Product ID
+            location_id (int): Optional location filter
+            limit (int): Maximum number of serial numbers to return
+            cursor (str): next_cursor of the previous page
             
-            if quants:
-                available_serials.append(lot._format_for_mobile())
+        Returns:
+            dict: {'serials': list of available serial numbers (by name),
+                   'next_cursor': cursor of the next page or None on the last page}
         
-        return available_serials
+        Raises:
+            ValueError: if the cursor is invalid
+        """
+        after_name, after_id = decode_cursor(cursor, 2) if cursor else ('', 0)
+        
+        lots = self.browse(self._get_available_lot_ids(
+            [product_id], location_id=location_id, after_name=after_name, after_id=after_id, limit=limit
+        ))
+        serials = lots._format_for_mobile_batch()
+        
+        next_cursor = None
+        if limit and len(lots) == limit:
+            next_cursor = encode_cursor(lots[-1].name, lots[-1].id)
+        
+        return {
+            'serials': serials,
+            'next_cursor': next_cursor
+        }
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+# Quant fields the stored stock information of lots depends on
+MOBILE_STOCK_QUANT_FIELDS = {'lot_id', 'location_id', 'quantity', 'reserved_quantity'}
+
+
+class StockQuant(models.Model):
+    _inherit = 'stock.quant'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        quants = super().create(vals_list)
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(quants.lot_id.ids)
+        return quants
+
+    def write(self, vals):
+        if not MOBILE_STOCK_QUANT_FIELDS.intersection(vals):
+            return super().write(vals)
+        # Refresh the lots the quants leave as well as the ones they move to
+        lot_ids = self.lot_id.ids
+        res = super().write(vals)
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(lot_ids + self.lot_id.ids)
+        return res
+
+    def unlink(self):
+        lot_ids = self.lot_id.ids
+        res = super().unlink()
+        self.env['stock.production.lot'].sudo()._refresh_mobile_stock(lot_ids)
+        return res
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class ValidationJob(models.Model):
+    """Picking validation requested by the mobile app, run later by a cron worker"""
+    _name = 'stock_scan_mobile.validation.job'
+    _description = 'Mobile Picking Validation Job'
+    _order = 'id desc'
+
+    picking_id = fields.Many2one('stock.picking', string='Picking', required=True, index=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Requested By')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string='Status', default='queued', required=True, index=True)
+    backorder_policy = fields.Selection([
+        ('backorder', 'Create Backorder'),
+        ('no_backorder', 'No Backorder')
+    ], string='Backorder Policy', default='backorder', required=True,
+        help='What to do with the remaining quantities when the picking is only partially processed')
+    error = fields.Text(string='Error')
+    date_started = fields.Datetime(string='Started On')
+    date_done = fields.Datetime(string='Finished On')
+
+    @api.model
+    def enqueue(self, picking, backorder_policy='backorder', user_id=None):
+        """
+        Queue the validation of a picking, reusing a job already waiting for it
+
+        Returns:
+            stock_scan_mobile.validation.job: the queued job
+        """
+        job = self.search([('picking_id', '=', picking.id), ('state', '=', 'queued')], limit=1)
+        if job:
+            job.write({
+                'user_id': user_id or job.user_id.id,
+                'backorder_policy': backorder_policy or 'backorder',
+            })
+        else:
+            job = self.create({
+                'picking_id': picking.id,
+                'user_id': user_id,
+                'backorder_policy': backorder_policy or 'backorder',
+            })
+        self.env.ref('stock_scan_mobile.ir_cron_process_validation_jobs')._trigger()
+        _logger.info(f"Queued validation of picking {picking.name} (job {job.id})")
+        return job
+
+    def _format_for_mobile(self):
+        """Format job status for mobile app"""
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'state': self.state,
+            'backorder_policy': self.backorder_policy,
+            'error': self.error or '',
+            'create_date': self.create_date.isoformat() if self.create_date else None,
+            'date_started': self.date_started.isoformat() if self.date_started else None,
+            'date_done': self.date_done.isoformat() if self.date_done else None
+        }
+
+    @api.model
+    def _cron_process_jobs(self, limit=50):
+        """
+        Run queued jobs, committing after each one
+
+        Jobs are claimed with FOR UPDATE SKIP LOCKED so that several cron
+        workers can process the queue concurrently. Jobs left running by a
+        crashed worker are queued again after 30 minutes.
+        """
+        self.search([
+            ('state', '=', 'running'),
+            ('date_started', '<', fields.Datetime.now() - timedelta(minutes=30))
+        ]).write({'state': 'queued'})
+        self.env.cr.commit()
+
+        for _i in range(limit):
+            self.env.cr.execute("""
+                SELECT id FROM stock_scan_mobile_validation_job
+                 WHERE state = 'queued'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+
+            job = self.browse(row[0])
+            job.write({'state': 'running', 'date_started': fields.Datetime.now()})
+            self.env.cr.commit()
+
+            job._run()
+            self.env.cr.commit()
+
+    def _run(self):
+        """
+        Validate the picking according to the backorder policy
+
+        The picking is validated as the user who queued the job, so that
+        their access rights apply and the chatter shows them as author.
+        """
+        self.ensure_one()
+        picking = self.picking_id
+        if self.user_id:
+            picking = picking.with_user(self.user_id)
+
+        try:
+            with self.env.cr.savepoint():
+                if picking.state not in ('done', 'cancel'):
+                    # Answer the wizards button_validate would otherwise open
+                    ctx = {'skip_backorder': True, 'skip_immediate': True, 'skip_sms': True}
+                    if self.backorder_policy == 'no_backorder':
+                        ctx['picking_ids_not_to_backorder'] = picking.ids
+                    result = picking.with_context(**ctx).button_validate()
+                    if isinstance(result, dict):
+                        raise UserError(f"Validation requires user input: {result.get('name') or result.get('res_model')}")
+            self.write({'state': 'done', 'error': False, 'date_done': fields.Datetime.now()})
+            _logger.info(f"Picking {picking.name} validated by job {self.id}")
+
+        except Exception as e:
+            _logger.warning(f"Could not validate picking {picking.name} (job {self.id}): {str(e)}")
+            self.write({'state': 'failed', 'error': str(e), 'date_done': fields.Datetime.now()})
+            self.picking_id.update_mobile_sync_status('error', str(e))
+
+    @api.model
+    def _gc_jobs(self, days=7):
+        """Remove finished jobs older than a few days"""
+        old = self.search([
+            ('state', 'in', ('done', 'failed')),
+            ('date_done', '<', fields.Datetime.now() - timedelta(days=days))
+        ])
+        old.unlink()
+        _logger.info(f"Removed {len(old)} picking validation jobs")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+from . import test_barcode_resolve
+from . import test_benchmark
+from . import test_idempotency
+from . import test_picking_changes
+from . import test_query_counts
+from . import test_validation_job
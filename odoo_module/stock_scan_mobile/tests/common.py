@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import timedelta
+from fractions import Fraction
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import HttpCase
+
+# 1x1 PNG
+TINY_PNG = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+
+
+class MobileApiCase(HttpCase):
+    """Warehouse fixtures and helpers to call the mobile API and count its queries"""
+
+    # Number of serial numbers in stock created for the tests
+    LOT_COUNT = 1000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = cls.env
+        cls.warehouse = env['stock.warehouse'].search([('company_id', '=', env.company.id)], limit=1)
+        cls.stock_location = cls.warehouse.lot_stock_id
+        cls.supplier_location = env.ref('stock.stock_location_suppliers')
+        cls.customer_location = env.ref('stock.stock_location_customers')
+
+        cls.user = env['res.users'].create({
+            'name': 'Mobile Test Scanner',
+            'login': 'stock_scan_mobile_test',
+            'password': 'stock_scan_mobile_test',
+            'groups_id': [(6, 0, [env.ref('stock.group_stock_user').id])],
+        })
+        cls.Token = env['stock_scan_mobile.token'].sudo()
+        cls.token = cls.Token.issue_token(cls.user.id)['token']
+        cls.admin_token = cls.Token.issue_token(env.ref('base.user_admin').id)['token']
+
+        cls.product = env['product.product'].create({
+            'name': 'Mobile Test Product',
+            'default_code': 'QC-PRODUCT',
+            'barcode': '4000000000001',
+            'type': 'product',
+            'tracking': 'serial',
+        })
+        cls.lots = env['stock.production.lot'].create([{
+            'name': f'QC-SN-{index:05d}',
+            'product_id': cls.product.id,
+            'company_id': env.company.id,
+        } for index in range(cls.LOT_COUNT)])
+        env['stock.quant'].create([{
+            'product_id': cls.product.id,
+            'lot_id': lot.id,
+            'location_id': cls.stock_location.id,
+            'quantity': 1.0,
+        } for lot in cls.lots])
+
+    def _sync(self):
+        """Write pending changes and empty the cache, so that every measure starts cold"""
+        self.env['base'].flush()
+        self.env['base'].invalidate_cache()
+
+    def _count_queries(self, func):
+        """
+        Run func and count the queries it sends, including those of HTTP
+        requests served during the call (they use the test cursor)
+
+        Returns:
+            tuple: (result of func, query count)
+        """
+        self._sync()
+        count = self.cr.sql_log_count
+        result = func()
+        self.env['base'].flush()
+        return result, self.cr.sql_log_count - count
+
+    def _count_queries_by_kind(self, func):
+        """
+        Like _count_queries, counting INSERT statements apart: Odoo 15 sends
+        one INSERT per created record, whatever the size of the create()
+
+        Returns:
+            tuple: (result of func, INSERT count, count of the other queries)
+        """
+        counts = {'insert': 0, 'other': 0}
+        execute = self.cr.execute
+
+        def counting_execute(query, *args, **kwargs):
+            counts['insert' if str(query).lstrip()[:6].upper() == 'INSERT' else 'other'] += 1
+            return execute(query, *args, **kwargs)
+
+        self._sync()
+        with patch.object(self.cr, 'execute', counting_execute):
+            result = func()
+            self.env['base'].flush()
+        return result, counts['insert'], counts['other']
+
+    def _call(self, path, params):
+        """Send a JSON-RPC request to the API and return its result"""
+        response = self.url_open(
+            path,
+            data=json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}),
+            headers={'Content-Type': 'application/json'},
+            timeout=120,
+        )
+        response.raise_for_status()
+        body = response.json()
+        self.assertNotIn('error', body, f"{path} raised an error")
+        return body['result']
+
+    def _count_call(self, path, params):
+        """Call a JSON-RPC route, check that it succeeded and return its query count"""
+        result, count = self._count_queries(lambda: self._call(path, params))
+        self.assertTrue(result.get('success'), f"{path} failed: {result}")
+        return count
+
+    def _count_get(self, path, expected_status=200, **kwargs):
+        """GET an http route, check its status and return its query count"""
+        response, count = self._count_queries(lambda: self.url_open(path, timeout=120, **kwargs))
+        self.assertEqual(response.status_code, expected_status, f"{path}: {response.text[:500]}")
+        return count
+
+    def assertQueryCountStable(self, measure, sizes):
+        """
+        Check that measure(size) counts the same number of queries for every size
+
+        measure(sizes[0]) is run once more beforehand to fill the caches of
+        the server.
+        """
+        measure(sizes[0])
+        counts = {size: measure(size) for size in sizes}
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"Query count grows with the input size ({{size: queries}}): {counts}"
+        )
+
+    def assertQueryCountLinear(self, measure, sizes):
+        """
+        Check that measure(size), returning (INSERT count, other query count),
+        sends the same number of non-INSERT queries for every size, and a
+        constant number of INSERTs per unit: one per record created for it
+
+        measure(sizes[0]) is run once more beforehand to fill the caches of
+        the server.
+        """
+        measure(sizes[0])
+        counts = {size: measure(size) for size in sizes}
+        other_counts = {size: other for size, (_inserts, other) in counts.items()}
+        self.assertEqual(
+            len(set(other_counts.values())), 1,
+            f"Non-INSERT query count grows with the input size ({{size: queries}}): {other_counts}"
+        )
+        insert_counts = {size: inserts for size, (inserts, _other) in counts.items()}
+        per_unit = {
+            Fraction(insert_counts[high] - insert_counts[low], high - low)
+            for low, high in zip(sizes, sizes[1:])
+        }
+        self.assertEqual(
+            len(per_unit), 1,
+            f"INSERTs per unit change with the input size ({{size: inserts}}): {insert_counts}"
+        )
+
+    # Fixtures
+    # --------
+
+    def _create_pickings(self, picking_type, location, location_dest, quantities):
+        """Create and confirm one picking per quantity, each with a move of the test product"""
+        pickings = self.env['stock.picking'].create([{
+            'picking_type_id': picking_type.id,
+            'location_id': location.id,
+            'location_dest_id': location_dest.id,
+            'move_lines': [(0, 0, {
+                'name': self.product.display_name,
+                'product_id': self.product.id,
+                'product_uom': self.product.uom_id.id,
+                'product_uom_qty': quantity,
+                'location_id': location.id,
+                'location_dest_id': location_dest.id,
+            })],
+        } for quantity in quantities])
+        pickings.action_confirm()
+        return pickings
+
+    def _create_outgoing_pickings(self, count):
+        """Create ready outgoing pickings of one serial number each"""
+        pickings = self._create_pickings(
+            self.warehouse.out_type_id, self.stock_location, self.customer_location, [1] * count)
+        pickings.action_assign()
+        return pickings
+
+    def _create_receipt(self, quantity):
+        """Create a ready receipt expecting quantity new serial numbers"""
+        receipt = self._create_pickings(
+            self.warehouse.in_type_id, self.supplier_location, self.stock_location, [quantity])
+        receipt.action_assign()
+        return receipt
+
+    def _serial_payload(self, picking, prefix):
+        move = picking.move_lines
+        return [{
+            'product_id': self.product.id,
+            'move_id': move.id,
+            'serial_number': f'{prefix}-{picking.id}-{index:05d}',
+            'location': 'A-01-01',
+        } for index in range(int(move.product_uom_qty))]
+
+    def _create_history(self, lot, count):
+        """Create count past move lines of a lot"""
+        now = fields.Datetime.now()
+        self.env['stock.move.line'].create([{
+            'product_id': self.product.id,
+            'product_uom_id': self.product.uom_id.id,
+            'lot_id': lot.id,
+            'location_id': self.supplier_location.id,
+            'location_dest_id': self.stock_location.id,
+            'qty_done': 1.0,
+            'company_id': self.env.company.id,
+            'date': now - timedelta(hours=index + 1),
+        } for index in range(count)])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import MobileApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestBarcodeResolve(MobileApiCase):
+    """Barcode resolution through /api/products/resolve and its cache"""
+
+    def _resolve(self, barcodes):
+        result = self._call('/api/products/resolve', {'token': self.token, 'barcodes': barcodes})
+        self.assertTrue(result.get('success'), result)
+        return {item['barcode']: item['found'] for item in result['results']}
+
+    def test_deleted_records_no_longer_resolve(self):
+        product = self.env['product.product'].create({
+            'name': 'Mobile Resolve Product',
+            'barcode': '4000000000101',
+        })
+        self.env['product.packaging'].create({
+            'name': 'Box of 10',
+            'product_id': product.id,
+            'qty': 10,
+            'barcode': '4000000000102',
+        })
+        barcodes = ['4000000000101', '4000000000102']
+
+        # Fill the resolution cache
+        self.assertEqual(self._resolve(barcodes), dict.fromkeys(barcodes, True))
+
+        product.packaging_ids.unlink()
+        self.assertEqual(self._resolve(barcodes), {'4000000000101': True, '4000000000102': False})
+
+        product.unlink()
+        self.assertEqual(self._resolve(barcodes), dict.fromkeys(barcodes, False))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from odoo.tests import HttpCase, tagged
+
+from ..benchmark import WarehouseGenerator, PRESETS, BenchmarkClient, run_scenarios, write_report
+
+
+@tagged('-standard', '-at_install', 'post_install', 'stock_scan_mobile_benchmark')
+class TestMobileApiBenchmark(HttpCase):
+    """
+    Time the mobile API scenarios and write a JSON report
+
+    Not part of the standard test run: select it with
+    --test-tags stock_scan_mobile_benchmark (see the benchmark package).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.preset = os.environ.get('STOCK_SCAN_MOBILE_BENCHMARK_PRESET', 'small')
+        cls.sizes = PRESETS[cls.preset]
+        cls.dataset = WarehouseGenerator(cls.env, **cls.sizes).generate()
+        # Profiled responses report their SQL query count
+        cls.env['ir.config_parameter'].sudo().set_param('stock_scan_mobile.profiling_enabled', 'True')
+        cls.env['ir.config_parameter'].sudo().set_param('stock_scan_mobile.profiling_slow_ms', '60000')
+
+    def test_benchmark(self):
+        iterations = int(os.environ.get('STOCK_SCAN_MOBILE_BENCHMARK_ITERATIONS', 30))
+        results = run_scenarios(BenchmarkClient(self.url_open, self.env), self.dataset, iterations=iterations)
+        write_report(results, self.sizes, self.preset)
+        self.assertEqual(set(results), {'login', 'picking_list', 'serial_check', 'serial_batch_check',
+                                        'serial_history', 'update_sn', 'product_search_exact',
+                                        'product_search_prefix', 'product_search_fuzzy'})
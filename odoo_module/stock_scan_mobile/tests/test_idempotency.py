@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import MobileApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestIdempotency(MobileApiCase):
+    """Uploads retried with the same idempotency key"""
+
+    def test_failed_upload_is_not_kept(self):
+        receipt = self._create_receipt(2)
+        payload = {
+            'token': self.token,
+            'serial_numbers': self._serial_payload(receipt, 'IK-UPLOAD'),
+            'idempotency_key': 'test-failed-upload',
+        }
+
+        Picking = type(self.env['stock.picking'])
+        process = Picking._process_mobile_serial_numbers_bulk
+
+        def process_then_fail(picking, serial_data_list):
+            process(picking, serial_data_list)
+            raise ValueError("Simulated failure after the records were created")
+
+        with patch.object(Picking, '_process_mobile_serial_numbers_bulk', process_then_fail):
+            result = self._call(f'/api/pickings/{receipt.id}/update_sn', payload)
+        self.assertEqual(result.get('error_code'), 'SERVER_ERROR', result)
+
+        result = self._call(f'/api/pickings/{receipt.id}/update_sn', payload)
+        self.assertTrue(result.get('success'), result)
+        self.assertFalse(result.get('replayed'))
+        self.assertEqual(result['processed'], 2)
+
+        self.env['base'].invalidate_cache()
+        self.assertEqual(len(receipt.move_line_ids.filtered('lot_id')), 2)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import MobileApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestPickingChanges(MobileApiCase):
+    """Delta sync of pickings with get_mobile_picking_changes"""
+
+    def _sync_all(self, cursor=None, limit=100):
+        """Follow the cursor until has_more is false; return the changes and the last cursor"""
+        Picking = self.env['stock.picking']
+        pickings, removed = [], []
+        for _page in range(100):
+            self._sync()
+            changes = Picking.get_mobile_picking_changes(cursor=cursor, limit=limit)
+            pickings += changes['pickings']
+            removed += changes['removed']
+            cursor = changes['next_cursor']
+            if not changes['has_more']:
+                return pickings, removed, cursor
+        self.fail("Delta sync keeps returning more pages")
+
+    def _set_settle_seconds(self, seconds):
+        self.env['ir.config_parameter'].sudo().set_param('stock_scan_mobile.sync_settle_seconds', seconds)
+
+    def test_second_sync_is_empty(self):
+        # All pickings are written in this transaction, so they share the same
+        # write date, microseconds included. Without a settle delay, nothing
+        # is sent twice.
+        self._set_settle_seconds(0)
+        created = self._create_outgoing_pickings(5)
+        pickings, removed, cursor = self._sync_all(limit=2)
+        self.assertLessEqual(set(created.ids), {picking['id'] for picking in pickings})
+
+        pickings, removed, cursor = self._sync_all(cursor, limit=2)
+        self.assertEqual(pickings, [])
+        self.assertEqual(removed, [])
+
+    def test_late_commit_is_delivered(self):
+        self._set_settle_seconds(60)
+        synced = self._create_outgoing_pickings(2)
+        pickings, removed, cursor = self._sync_all()
+        self.assertLessEqual(set(synced.ids), {picking['id'] for picking in pickings})
+
+        # A transaction started 30 seconds before the sync commits its
+        # picking after it: its write dates are older than the sync
+        late = self._create_outgoing_pickings(1)
+        self.env['base'].flush()
+        for table, column in (('stock_picking', 'id'), ('stock_move', 'picking_id')):
+            self.env.cr.execute(f"""
+                UPDATE {table} SET write_date = (now() AT TIME ZONE 'UTC') - interval '30 seconds'
+                 WHERE {column} = %s
+            """, [late.id])
+        self.env['base'].invalidate_cache()
+
+        pickings, removed, cursor = self._sync_all(cursor)
+        self.assertIn(late.id, {picking['id'] for picking in pickings})
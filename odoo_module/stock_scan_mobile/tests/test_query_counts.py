@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import MobileApiCase, TINY_PNG
+
+# Input sizes compared by every test
+SIZES = (1, 100, 1000)
+# Pickings are slower to create, so picking lists are compared on smaller sizes
+PICKING_SIZES = (1, 10, 100)
+# Routes without a variable input are compared across repeated calls
+REPEATS = (1, 2, 3)
+
+
+@tagged('post_install', '-at_install')
+class TestRouteQueryCounts(MobileApiCase):
+    """The query count of every /api/* route must not depend on the size of its input or data"""
+
+    # Authentication
+
+    def test_login(self):
+        def measure(size):
+            # Login removes the expired tokens of the user
+            self.Token.create([{
+                'token_hash': self.Token._hash_token(f'expired-{size}-{index}'),
+                'user_id': self.user.id,
+                'expires_at': fields.Datetime.now() - timedelta(hours=1),
+            } for index in range(size)])
+            return self._count_call('/api/auth/login', {
+                'username': 'stock_scan_mobile_test',
+                'password': 'stock_scan_mobile_test',
+            })
+        self.assertQueryCountStable(measure, SIZES)
+
+    def _create_tokens(self, count):
+        for _index in range(count):
+            self.Token.issue_token(self.user.id)
+
+    def test_validate(self):
+        def measure(size):
+            self._create_tokens(size)
+            return self._count_call('/api/auth/validate', {'token': self.token})
+        self.assertQueryCountStable(measure, SIZES)
+
+    def test_logout(self):
+        def measure(size):
+            self._create_tokens(size)
+            token = self.Token.issue_token(self.user.id)['token']
+            return self._count_call('/api/auth/logout', {'token': token})
+        self.assertQueryCountStable(measure, SIZES)
+
+    # Pickings
+
+    def test_pickings(self):
+        self._create_outgoing_pickings(max(PICKING_SIZES))
+        self.assertQueryCountStable(
+            lambda size: self._count_call('/api/pickings', {'token': self.token, 'type': 'out', 'limit': size}),
+            PICKING_SIZES)
+
+    def test_pickings_changes(self):
+        self._create_outgoing_pickings(max(PICKING_SIZES))
+        self.assertQueryCountStable(
+            lambda size: self._count_call('/api/pickings/changes', {'token': self.token, 'limit': size}),
+            PICKING_SIZES)
+
+    def test_update_sn(self):
+        # Every serial number creates a lot and a move line, one INSERT each
+        def measure(size):
+            receipt = self._create_receipt(size)
+            result, inserts, other = self._count_queries_by_kind(
+                lambda: self._call(f'/api/pickings/{receipt.id}/update_sn', {
+                    'token': self.token,
+                    'serial_numbers': self._serial_payload(receipt, 'QC-UPLOAD'),
+                }))
+            self.assertTrue(result.get('success'), result)
+            return inserts, other
+        self.assertQueryCountLinear(measure, SIZES)
+
+    def test_validation_status(self):
+        picking = self._create_receipt(1)
+        Job = self.env['stock_scan_mobile.validation.job'].sudo()
+
+        def measure(size):
+            Job.create([{'picking_id': picking.id, 'state': 'done'} for _index in range(size)])
+            return self._count_call(f'/api/pickings/{picking.id}/validation_status', {'token': self.token})
+        self.assertQueryCountStable(measure, SIZES)
+
+    # Serial numbers
+
+    def test_serial_check(self):
+        def measure(size):
+            lot = self.lots[size]
+            self._create_history(lot, size)
+            return self._count_call('/api/serial/check', {'token': self.token, 'serial_number': lot.name})
+        self.assertQueryCountStable(measure, (1, 100, 500))
+
+    def test_serial_batch_check(self):
+        names = self.lots.mapped('name')
+        self.assertQueryCountStable(
+            lambda size: self._count_call('/api/serial/batch_check', {
+                'token': self.token,
+                'serial_numbers': names[:size],
+            }),
+            SIZES)
+
+    def test_serial_history(self):
+        lot = self.lots[0]
+        self._create_history(lot, max(SIZES))
+        self.assertQueryCountStable(
+            lambda size: self._count_call('/api/serial/history', {
+                'token': self.token,
+                'serial_number': lot.name,
+                'limit': size,
+            }),
+            SIZES)
+
+    # Products
+
+    def test_products_resolve(self):
+        products = self.env['product.product'].create([{
+            'name': f'Mobile Test Resolve {index:05d}',
+            'barcode': f'5{index:012d}',
+            'type': 'product',
+        } for index in range(2 * max(SIZES))])
+        barcodes = products.mapped('barcode')
+        # Every measure resolves barcodes never seen before, as resolved
+        # barcodes are kept in the ORM cache
+        next_barcodes = iter(barcodes)
+
+        def measure(size):
+            return self._count_call('/api/products/resolve', {
+                'token': self.token,
+                'barcodes': [next(next_barcodes) for _index in range(size)],
+            })
+        self.assertQueryCountStable(measure, SIZES)
+
+    def test_product_thumbnail(self):
+        self.product.image_1920 = TINY_PNG
+        self.assertQueryCountStable(
+            lambda size: self._count_get(
+                f'/api/products/{self.product.id}/thumbnail',
+                headers={'Authorization': f'Bearer {self.token}'}),
+            REPEATS)
+
+    # Provisioning and monitoring
+
+    def test_export_provisioning(self):
+        def measure(size):
+            ready = self.env['stock.picking'].search_count([('state', '=', 'assigned')])
+            if ready < size:
+                self._create_outgoing_pickings(size - ready)
+            return self._count_get(
+                f'/api/export/provisioning?token={self.token}&batch_size=1000')
+        self.assertQueryCountStable(measure, PICKING_SIZES)
+
+    def test_health(self):
+        self.assertQueryCountStable(lambda size: self._count_get('/api/health'), REPEATS)
+
+    def test_databases(self):
+        self.assertQueryCountStable(lambda size: self._count_get('/api/databases'), REPEATS)
+
+    def test_metrics(self):
+        self.assertQueryCountStable(lambda size: self._count_get('/api/metrics'), REPEATS)
+
+    def test_slow_requests(self):
+        self.assertQueryCountStable(
+            lambda size: self._count_call('/api/admin/slow_requests', {'token': self.admin_token}),
+            REPEATS)
+
+
+@tagged('post_install', '-at_install')
+class TestModelQueryCounts(MobileApiCase):
+    """The query count of the mobile model methods must not depend on the size of their input"""
+
+    def test_get_mobile_pickings(self):
+        self._create_outgoing_pickings(max(PICKING_SIZES))
+        Picking = self.env['stock.picking']
+        self.assertQueryCountStable(
+            lambda size: self._count_queries(lambda: Picking.get_mobile_pickings('out', limit=size))[1],
+            PICKING_SIZES)
+
+    def test_search_serial_numbers(self):
+        Lot = self.env['stock.production.lot']
+
+        def measure(size):
+            result, count = self._count_queries(lambda: Lot.search_serial_numbers('QC-SN-', limit=size))
+            self.assertEqual(len(result), size)
+            return count
+        self.assertQueryCountStable(measure, SIZES)
+
+    def test_batch_check_serial_existence(self):
+        Lot = self.env['stock.production.lot']
+        names = self.lots.mapped('name')
+        self.assertQueryCountStable(
+            lambda size: self._count_queries(lambda: Lot.batch_check_serial_existence(names[:size]))[1],
+            SIZES)
+
+    def test_process_mobile_serial_numbers(self):
+        Picking = self.env['stock.picking']
+
+        def measure(size):
+            receipt = self._create_receipt(size)
+            payload = self._serial_payload(receipt, 'QC-PROCESS')
+            result, inserts, other = self._count_queries_by_kind(
+                lambda: Picking.process_mobile_serial_numbers(receipt.id, payload))
+            self.assertEqual(result['processed'], size, result)
+            return inserts, other
+        self.assertQueryCountLinear(measure, SIZES)
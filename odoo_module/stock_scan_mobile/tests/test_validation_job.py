@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import MobileApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestValidationJob(MobileApiCase):
+    """Background validation of pickings uploaded through update_sn"""
+
+    def _upload_partial(self, backorder_policy):
+        """Upload one of the three serial numbers of a receipt, asking for its validation"""
+        receipt = self._create_receipt(3)
+        result = self._call(f'/api/pickings/{receipt.id}/update_sn', {
+            'token': self.token,
+            'serial_numbers': self._serial_payload(receipt, 'VJ-UPLOAD')[:1],
+            'validate': True,
+            'backorder_policy': backorder_policy,
+        })
+        self.assertTrue(result.get('success'), result)
+        self.assertTrue(result['validation_job_id'], "Partial validation was not queued")
+        job = self.env['stock_scan_mobile.validation.job'].browse(result['validation_job_id'])
+        job._run()
+        self.assertEqual(job.state, 'done', job.error)
+        self.assertEqual(receipt.state, 'done')
+        return receipt
+
+    def test_partial_no_backorder(self):
+        receipt = self._upload_partial('no_backorder')
+        self.assertFalse(self.env['stock.picking'].search([('backorder_id', '=', receipt.id)]))
+        cancelled = receipt.move_lines.filtered(lambda move: move.state == 'cancel')
+        self.assertEqual(sum(cancelled.mapped('product_uom_qty')), 2)
+
+    def test_partial_backorder(self):
+        receipt = self._upload_partial('backorder')
+        backorder = self.env['stock.picking'].search([('backorder_id', '=', receipt.id)])
+        self.assertEqual(sum(backorder.move_lines.mapped('product_uom_qty')), 2)
+
+    def test_partial_upload_is_not_validated(self):
+        receipt = self._create_receipt(3)
+        result = self._call(f'/api/pickings/{receipt.id}/update_sn', {
+            'token': self.token,
+            'serial_numbers': self._serial_payload(receipt, 'VJ-UPLOAD')[:1],
+        })
+        self.assertTrue(result.get('success'), result)
+        self.assertFalse(result['validation_job_id'])
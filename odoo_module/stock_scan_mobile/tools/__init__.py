@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+from .cache import TTLCache
+from .cursor import encode_cursor, decode_cursor, decode_cursor_datetime
+from .compression import gzip_stream, compress_body, decompress_body, negotiate_encoding
+from .etag import make_etag, check_not_modified
+from .metrics import metrics, get_spool, render_prometheus
+from .profiling import RequestProfiler, get_slow_request_log
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import zlib
+
+# Encodings the API can send, by order of preference
+RESPONSE_ENCODINGS = ('gzip', 'deflate')
+
+
+def gzip_stream(chunks, level=6):
+    """Compress an iterable of bytes into a gzip stream, chunk by chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_body(data, encoding, level=6):
+    """Compress a whole body with the 'gzip' or 'deflate' (zlib format) content coding"""
+    wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress_body(data, encoding, max_size):
+    """
+    Decompress a 'gzip' or 'deflate' encoded body
+
+    Deflate bodies are accepted in zlib format, as specified by HTTP, and as
+    raw deflate streams, which some clients send instead.
+
+    Raises:
+        ValueError: if the body is invalid or inflates to more than max_size bytes
+    """
+    if encoding == 'gzip':
+        wbits = 16 + zlib.MAX_WBITS
+    elif len(data) >= 2 and data[0] & 0x0f == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+        wbits = zlib.MAX_WBITS
+    else:
+        wbits = -zlib.MAX_WBITS
+    decompressor = zlib.decompressobj(wbits)
+    try:
+        body = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise ValueError(f"Invalid {encoding} body: {str(e)}") from e
+    if len(body) > max_size or decompressor.unconsumed_tail:
+        raise ValueError(f"Decompressed body larger than {max_size} bytes")
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {encoding} body")
+    return body
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the response encoding from an Accept-Encoding header
+
+    Returns:
+        str: 'gzip' or 'deflate', the one with the highest quality (gzip on
+        a tie), or None if the client accepts neither
+    """
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _sep, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _sep, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in RESPONSE_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+from datetime import date, datetime
+
+
+def encode_cursor(*values):
+    """
+    Pack keyset values into an opaque, URL-safe cursor string
+
+    Datetimes are serialized in ISO format with their microseconds, as
+    write dates compared to them have; use :func:`decode_cursor_datetime`
+    on the decoded values to restore them.
+    """
+    payload = [
+        value.isoformat(sep=' ', timespec='microseconds') if isinstance(value, datetime)
+        else value.isoformat() if isinstance(value, date)
+        else value
+        for value in values
+    ]
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """
+    Unpack a cursor built by :func:`encode_cursor`
+
+    Raises:
+        ValueError: if the cursor is malformed or does not hold ``size`` values
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def decode_cursor_datetime(value):
+    """
+    Restore a datetime packed by :func:`encode_cursor`, at full precision
+
+    Cursors written before microseconds were kept ('%Y-%m-%d %H:%M:%S') are
+    accepted too.
+
+    Raises:
+        ValueError: if the value is not a datetime
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid cursor datetime: {value!r}")
+    return datetime.fromisoformat(value)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+
+from odoo.http import request
+
+
+def make_etag(*values):
+    """Build a weak ETag from values identifying a response (IDs, write dates, cursors...)"""
+    data = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return 'W/"%s"' % hashlib.sha1(data).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an ETag with the value of an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque_tag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque_tag:
+            return True
+    return False
+
+
+def check_not_modified(etag, data=None):
+    """
+    Tag the current API response with a weak ETag (sent as a header by
+    ir.http) and compare it to the one the client already has, given in the
+    If-None-Match header or, for clients that cannot set headers, as
+    "if_none_match" in the JSON payload.
+
+    Returns:
+        dict: the JSON-RPC result telling the client that its copy is still
+        current, or None when the full response must be built
+    """
+    request.stock_scan_mobile_etag = etag
+    if_none_match = request.httprequest.headers.get('If-None-Match') or (data or {}).get('if_none_match')
+    if etag_matches(if_none_match, etag):
+        return {'success': True, 'unchanged': True, 'etag': etag}
+    return None
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from odoo.tools import config
+
+from .process import is_process_alive
+
+_logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# How often a worker writes its counters to the spool directory (seconds)
+SPOOL_INTERVAL = 5
+
+
+class Metrics(object):
+    """
+    Thread-safe in-process counters and histograms.
+
+    Every Odoo process keeps its own values. In prefork mode each worker
+    periodically writes them to a spool file, see :class:`MetricsSpool`,
+    and the metrics endpoint adds up the files of all workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}      # (name, labels) -> value
+        self._histograms = {}    # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._buckets = {}       # name -> bucket upper bounds
+        self._collectors = []
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        """Add ``value`` to a counter"""
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets, labels=None):
+        """Record ``value`` in a histogram whose buckets are the upper bounds ``buckets``"""
+        key = (name, self._labels(labels))
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            self._buckets.setdefault(name, buckets)
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def register_collector(self, collector):
+        """
+        Add a callable returning ``[(name, labels, value)]`` counters read at
+        snapshot time, for values already counted elsewhere (cache statistics)
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Return all values as a JSON-serializable dict"""
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [
+                [name, list(labels), list(self._buckets[name]), list(counts)]
+                for (name, labels), counts in self._histograms.items()
+            ]
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    counters.append([name, list(self._labels(labels)), value])
+            except Exception as e:
+                _logger.warning(f"Metrics collector failed: {str(e)}")
+        return {'counters': counters, 'histograms': histograms}
+
+
+def merge_snapshots(snapshots):
+    """Add up snapshots, from several workers or generations of workers"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts in snapshot.get('histograms', []):
+            key = (name, tuple(tuple(label) for label in labels), tuple(buckets))
+            total = histograms.get(key)
+            histograms[key] = counts if total is None else [a + b for a, b in zip(total, counts)]
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), list(buckets), counts]
+            for (name, labels, buckets), counts in histograms.items()
+        ],
+    }
+
+
+def _format_labels(labels, extra=()):
+    labels = list(labels) + list(extra)
+    if not labels:
+        return ''
+    escaped = (
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    typed = set()
+    for name, labels, value in sorted(snapshot['counters'], key=lambda c: (c[0], c[1])):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    for name, labels, buckets, counts in sorted(snapshot['histograms'], key=lambda h: (h[0], h[1])):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f'# TYPE {name} histogram')
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ['+Inf'], counts[:-1]):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {counts[-1]}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsSpool(object):
+    """
+    Share the metrics of all the processes of an Odoo server through files.
+
+    Each process writes its snapshot to ``<pid>.json`` at most every
+    SPOOL_INTERVAL seconds. When a file belongs to a process that has
+    exited (prefork workers are recycled), its values are added to
+    ``retired.json`` so that counters never go backwards.
+    """
+
+    def __init__(self, metrics, directory, interval=SPOOL_INTERVAL):
+        self.metrics = metrics
+        self.directory = directory
+        self.interval = interval
+        self._last_dump = 0
+        self._dump_lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _write(path, data):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def maybe_dump(self):
+        """Write this process' snapshot if the last one is older than the interval"""
+        if time.monotonic() - self._last_dump >= self.interval:
+            self.dump()
+
+    def dump(self):
+        if not self._dump_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_dump = time.monotonic()
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._path(f'{os.getpid()}.json'), self.metrics.snapshot())
+        except OSError as e:
+            _logger.warning(f"Could not write metrics to {self.directory}: {str(e)}")
+        finally:
+            self._dump_lock.release()
+
+    def collect(self):
+        """Return the merged snapshot of all processes, current and past"""
+        self.dump()
+        pid = os.getpid()
+        snapshots = [self.metrics.snapshot()]
+        try:
+            with open(self._path('retired.lock'), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                retired = [self._read(self._path('retired.json')) or {}]
+                newly_retired = []
+                for filename in os.listdir(self.directory):
+                    if not filename.endswith('.json') or not filename[:-5].isdigit():
+                        continue
+                    worker_pid = int(filename[:-5])
+                    if worker_pid == pid:
+                        continue
+                    snapshot = self._read(self._path(filename))
+                    if snapshot is None:
+                        continue
+                    if is_process_alive(worker_pid):
+                        snapshots.append(snapshot)
+                    else:
+                        newly_retired.append(filename)
+                        retired.append(snapshot)
+                if newly_retired:
+                    self._write(self._path('retired.json'), merge_snapshots(retired))
+                    for filename in newly_retired:
+                        os.unlink(self._path(filename))
+                snapshots.append(merge_snapshots(retired))
+        except OSError as e:
+            _logger.warning(f"Could not read metrics from {self.directory}: {str(e)}")
+        return merge_snapshots(snapshots)
+
+
+metrics = Metrics()
+_spool = None
+
+
+def get_spool():
+    """Return the spool of this process, in the data directory of the server"""
+    global _spool
+    if _spool is None:
+        _spool = MetricsSpool(metrics, os.path.join(config['data_dir'], 'stock_scan_mobile', 'metrics'))
+    return _spool
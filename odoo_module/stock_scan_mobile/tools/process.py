@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+
+def is_process_alive(pid):
+    """
+    Tell whether a process still exists, e.g. the worker that wrote a spool file
+
+    A process owned by another user counts as alive.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+from odoo.tools import config
+
+from .process import is_process_alive
+
+_logger = logging.getLogger(__name__)
+
+# Number of slow requests kept per server
+SLOW_REQUEST_LOG_SIZE = 100
+# Longest query text kept in a profile
+MAX_QUERY_LENGTH = 2000
+
+
+class RequestProfiler(object):
+    """
+    Collect the wall time, SQL count, SQL time and slowest queries of the
+    request running in the current thread, and optionally a cProfile trace.
+
+    Queries are observed through the ``query_hooks`` of the thread, which
+    the cursors of Odoo call after every execute.
+    """
+
+    def __init__(self, top_queries=5, cprofile=False):
+        self.top_queries = top_queries
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self._queries = []      # heap of (delay, sequence, query)
+        self._sequence = itertools.count()
+        self._thread = None
+        self._previous_hooks = None
+
+    def _query_hook(self, cr, query, params, start, delay):
+        # Only the queries entering the top are turned into text
+        if len(self._queries) < self.top_queries:
+            heapq.heappush(self._queries, (delay, next(self._sequence), str(query)[:MAX_QUERY_LENGTH]))
+        elif self._queries and delay > self._queries[0][0]:
+            heapq.heapreplace(self._queries, (delay, next(self._sequence), str(query)[:MAX_QUERY_LENGTH]))
+
+    def start(self):
+        self._thread = threading.current_thread()
+        self._start_count = getattr(self._thread, 'query_count', 0)
+        self._start_query_time = getattr(self._thread, 'query_time', 0.0)
+        self._previous_hooks = getattr(self._thread, 'query_hooks', None)
+        if self.top_queries:
+            self._thread.query_hooks = list(self._previous_hooks or ()) + [self._query_hook]
+        self._start = time.perf_counter()
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile:
+            self.cprofile.disable()
+        self.duration = time.perf_counter() - self._start
+        self.query_count = getattr(self._thread, 'query_count', 0) - self._start_count
+        self.query_time = getattr(self._thread, 'query_time', 0.0) - self._start_query_time
+        if self._previous_hooks is None:
+            if hasattr(self._thread, 'query_hooks'):
+                del self._thread.query_hooks
+        else:
+            self._thread.query_hooks = self._previous_hooks
+
+    def slowest_queries(self):
+        """Return the slowest queries, slowest first"""
+        return [
+            {'duration_ms': round(delay * 1000, 3), 'query': query}
+            for delay, _sequence, query in sorted(self._queries, reverse=True)
+        ]
+
+    def cprofile_stats(self, limit=40):
+        """Return the cProfile report (by cumulative time) as text, if sampled"""
+        if not self.cprofile:
+            return None
+        output = io.StringIO()
+        pstats.Stats(self.cprofile, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+
+class SlowRequestLog(object):
+    """
+    Most recent slow requests, bounded to ``size`` entries.
+
+    Each process keeps a ring buffer in memory and writes it to
+    ``<pid>.json`` whenever it changes, so that the admin endpoint, served
+    by any prefork worker, can merge the entries of all workers.
+    """
+
+    def __init__(self, directory, size=SLOW_REQUEST_LOG_SIZE):
+        self.directory = directory
+        self.size = size
+        self._entries = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            entries = list(self._entries)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(f'{os.getpid()}.json')
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, separators=(',', ':'), default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            _logger.warning(f"Could not write slow request log to {self.directory}: {str(e)}")
+
+    def read(self, limit=None):
+        """Return the most recent entries of all processes, latest first"""
+        limit = min(limit or self.size, self.size)
+        with self._lock:
+            entries = list(self._entries)
+        pid_file = f'{os.getpid()}.json'
+        stale_files = []
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            filenames = []
+        for filename in filenames:
+            if filename == pid_file or not filename.endswith('.json') or not filename[:-5].isdigit():
+                continue
+            try:
+                with open(self._path(filename)) as f:
+                    worker_entries = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.extend(worker_entries)
+            if not is_process_alive(int(filename[:-5])):
+                stale_files.append((filename, worker_entries))
+
+        entries.sort(key=lambda entry: entry['timestamp'], reverse=True)
+        entries = entries[:limit]
+
+        # Forget exited workers once none of their entries is recent enough
+        if len(entries) == limit:
+            oldest = entries[-1]['timestamp']
+            for filename, worker_entries in stale_files:
+                if all(entry['timestamp'] < oldest for entry in worker_entries):
+                    try:
+                        os.unlink(self._path(filename))
+                    except OSError:
+                        pass
+        return entries
+
+
+_slow_request_log = None
+
+
+def get_slow_request_log():
+    """Return the slow request log of this process, in the data directory of the server"""
+    global _slow_request_log
+    if _slow_request_log is None:
+        _slow_request_log = SlowRequestLog(os.path.join(config['data_dir'], 'stock_scan_mobile', 'slow_requests'))
+    return _slow_request_log